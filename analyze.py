@@ -0,0 +1,272 @@
+"""
+Batch analysis of positions with the searches of `minimax.py`, `expectimax.py` and `endgame.py`.
+
+Positions are read from a text file with one packed position per line: the black and white
+bitboards as 16 hex digits each and the player to move, e.g.
+
+    0000000810000000 0000001008000000 B
+
+Blank lines and lines starting with '#' are skipped. The file is read lazily and positions are
+sent in chunks to a pool of worker processes, with at most `window` chunks in flight, so memory
+stays bounded however long the file is and reading waits for the workers (backpressure).
+Results come back as one JSON line per position, in input order:
+
+    {"index": 0, "move": [2, 3], "score": 3, "nodes": 1312, "seconds": 0.0123}
+
+After every chunk a checkpoint records how many positions are done and how long the output is
+at that point. Running the same command again after an interruption truncates the output to the
+checkpoint and carries on from there. The checkpoint is removed when the run completes.
+
+The search is given as `name` or `name:key=value,...`, see `specs.py`:
+
+    python analyze.py positions.txt --search minimax:depth=4 --output analysis.jsonl --workers 4
+"""
+import argparse
+import collections
+import contextlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from board import Board
+from endgame import solve
+from expectimax import evaluation_bounds, expectimax
+from minimax import evaluate_board, minimax, pvs
+from specs import parse_spec
+from stats import SearchStats
+
+
+def search_minimax(board, color, stats, depth=4, use_pruning=True, evaluate=None):
+    return minimax(board, depth, True, color, use_pruning, stats=stats, evaluate=evaluate)
+
+
+def search_pvs(board, color, stats, depth=4, evaluate=None):
+    return pvs(board, depth, color, stats=stats, evaluate=evaluate)
+
+
+def search_expectimax(board, color, stats, depth=3, evaluate=evaluate_board, opponent_model=None, pruning=False):
+    bounds = evaluation_bounds(evaluate, board.size) if pruning else None
+    return expectimax(board, depth, True, color, evaluate, opponent_model, bounds, stats)
+
+
+def search_solve(board, color, stats):
+    return solve(board, color, stats)
+
+
+# Search names accepted by --search; each is called as search(board, color, stats, **options)
+# and returns (move, score) with the score from the point of view of the player to move
+SEARCHES = {
+    'minimax': search_minimax,
+    'pvs': search_pvs,
+    'expectimax': search_expectimax,
+    'solve': search_solve,
+}
+
+
+def parse_position(text):
+    """
+    Parses a packed position line.
+
+    Returns:
+        tuple: The black bitboard, the white bitboard and the player to move.
+
+    Raises:
+        ValueError: If the line is not a valid position.
+    """
+    fields = text.split()
+    if len(fields) != 3 or fields[2] not in ('B', 'W'):
+        raise ValueError(f"Expected '<black hex> <white hex> <B|W>', got {text!r}")
+    black, white = int(fields[0], 16), int(fields[1], 16)
+    if black >> 64 or white >> 64 or black & white:
+        raise ValueError(f"Invalid bitboards in {text!r}")
+    return black, white, fields[2]
+
+
+def format_position(board, color):
+    """Returns the packed position line (without newline) for `color` to move on an 8x8 `board`."""
+    return f"{board.black:016x} {board.white:016x} {color}"
+
+
+def read_positions(path):
+    """Yields (black, white, color) for every position in the file at `path` ('-' for stdin), lazily."""
+    with contextlib.ExitStack() as stack:
+        handle = sys.stdin if path == '-' else stack.enter_context(open(path))
+        for number, line in enumerate(handle, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                yield parse_position(line)
+            except ValueError as error:
+                raise ValueError(f"{path}:{number}: {error}") from None
+
+
+@lru_cache(maxsize=None)
+def _resolve(spec):
+    # Parsed once per process; resolving function options imports their modules
+    name, options = parse_spec(spec, SEARCHES, 'search')
+    return SEARCHES[name], options
+
+
+def analyze_chunk(spec, start, positions):
+    """
+    Analyzes a list of (black, white, color) positions numbered from `start`. Runs in the workers.
+
+    Returns:
+        list: One result dict per position, see the module docstring.
+    """
+    search, options = _resolve(spec)
+    results = []
+    for index, (black, white, color) in enumerate(positions, start):
+        board = Board.from_bitboards(black, white)
+        stats = SearchStats()
+        begin = time.perf_counter()
+        move, score = search(board, color, stats, **options)
+        results.append({
+            'index': index,
+            'move': move,
+            'score': score,
+            'nodes': stats.nodes,
+            'seconds': round(time.perf_counter() - begin, 4),
+        })
+    return results
+
+
+def analyze(positions, spec, workers=1, chunk_size=64, window=None, start=0):
+    """
+    Analyzes a stream of positions and yields the results in input order.
+
+    Args:
+        positions (iterable): (black, white, color) tuples; consumed lazily.
+        spec (str): The search spec, e.g. 'minimax:depth=4'.
+        workers (int): Worker processes; 1 analyzes in this process.
+        chunk_size (int): Positions sent to a worker at a time.
+        window (int, optional): The most chunks in flight, by default twice the workers. Reading
+            stops until the oldest chunk's results have been consumed.
+        start (int): The index of the first position.
+
+    Yields:
+        dict: One result per position, see the module docstring.
+    """
+    _resolve(spec)
+    chunks = _chunks(positions, chunk_size, start)
+    if workers == 1:
+        for first, chunk in chunks:
+            yield from analyze_chunk(spec, first, chunk)
+        return
+
+    window = window or 2 * workers
+    with ProcessPoolExecutor(workers) as executor:
+        pending = collections.deque()
+        for first, chunk in chunks:
+            pending.append(executor.submit(analyze_chunk, spec, first, chunk))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _chunks(positions, chunk_size, start):
+    # (index of the first position, positions) for consecutive slices of the stream
+    iterator = iter(positions)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def load_checkpoint(path, input_path, spec):
+    """
+    Returns (positions done, output length in bytes) from the checkpoint at `path`, or (0, 0)
+    if there is none.
+
+    Raises:
+        ValueError: If the checkpoint belongs to a different input file or search.
+    """
+    if path is None or not os.path.exists(path):
+        return 0, 0
+    with open(path) as handle:
+        state = json.load(handle)
+    if state['input'] != input_path or state['search'] != spec:
+        raise ValueError(f"Checkpoint {path} is for {state['input']} with {state['search']}; remove it to start over")
+    return state['done'], state['output_bytes']
+
+
+def save_checkpoint(path, input_path, spec, done, output_bytes):
+    """Atomically replaces the checkpoint at `path`."""
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump({'input': input_path, 'search': spec, 'done': done, 'output_bytes': output_bytes}, handle)
+    os.replace(temporary, path)
+
+
+def run(input_path, output_path, spec, workers=1, chunk_size=64, window=None, checkpoint_path=None):
+    """
+    Analyzes every position of a file and writes the results as JSON lines, resuming from
+    `checkpoint_path` if a run was interrupted.
+
+    Args:
+        input_path (str): The position file, '-' for stdin.
+        output_path (str): The JSONL output file, '-' for stdout (no checkpoints).
+        spec (str): The search spec.
+        workers, chunk_size, window: As for `analyze`.
+        checkpoint_path (str, optional): Where progress is recorded after every chunk.
+
+    Returns:
+        tuple: The number of positions analyzed in this run and the elapsed time in seconds.
+    """
+    if output_path == '-':
+        checkpoint_path = None
+    done, output_bytes = load_checkpoint(checkpoint_path, input_path, spec)
+    if done and not os.path.exists(output_path):
+        raise ValueError(f"Checkpoint {checkpoint_path} exists but the output {output_path} does not")
+
+    start = time.perf_counter()
+    analyzed = 0
+    with contextlib.ExitStack() as stack:
+        if output_path == '-':
+            output = sys.stdout
+        else:
+            if done:
+                # Drop whatever was written after the last checkpoint
+                os.truncate(output_path, output_bytes)
+            output = stack.enter_context(open(output_path, 'a' if done else 'w'))
+
+        positions = itertools.islice(read_positions(input_path), done, None)
+        for result in analyze(positions, spec, workers, chunk_size, window, start=done):
+            line = json.dumps(result) + '\n'
+            output.write(line)
+            output_bytes += len(line)
+            analyzed += 1
+            if checkpoint_path is not None and (done + analyzed) % chunk_size == 0:
+                output.flush()
+                save_checkpoint(checkpoint_path, input_path, spec, done + analyzed, output_bytes)
+        output.flush()
+
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return analyzed, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Analyze a file of positions with a search.")
+    parser.add_argument('input', help="position file, one '<black hex> <white hex> <B|W>' per line, '-' for stdin")
+    parser.add_argument('--search', default='minimax', help="search spec such as minimax:depth=4 or solve")
+    parser.add_argument('--output', default='-', help="JSONL results file, '-' for stdout")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--window', type=int, help="most chunks in flight, twice the workers by default")
+    parser.add_argument('--checkpoint', help="progress file, by default the output path plus .checkpoint")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or (None if args.output == '-' else args.output + '.checkpoint')
+    analyzed, elapsed = run(args.input, args.output, args.search, args.workers, args.chunk_size, args.window,
+                            checkpoint)
+    summary = sys.stderr if args.output == '-' else sys.stdout
+    print(f"{analyzed} positions in {elapsed:.2f}s ({analyzed / max(elapsed, 1e-9):.1f} positions/s)", file=summary)
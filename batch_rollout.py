@@ -0,0 +1,174 @@
+"""
+Vectorized random playouts with NumPy.
+
+`BatchRollout` advances K independent random games at once. Each game is a pair of uint64
+bitboards (the player to move and the opponent), so the whole batch is two arrays of shape
+(K,). Move generation and flipping are the same shift-and-mask fills as `board.moves_mask`,
+applied to every game at once; picking a random legal move unpacks the move masks into a
+(K, 64) bit matrix and selects the n-th set bit of every row.
+
+NumPy is only needed for this module, and only 8x8 boards are supported.
+
+Usage:
+    python batch_rollout.py [--batch 256] [--games 2048]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from board import Board, geometry
+
+_SHIFTS = []
+for _shift, _mask in geometry(8).up_shifts:
+    _SHIFTS.append((np.uint64(_shift), np.uint64(_mask), True))
+for _shift, _mask in geometry(8).down_shifts:
+    _SHIFTS.append((np.uint64(_shift), np.uint64(_mask), False))
+del _shift, _mask
+
+_FILL_STEPS = range(5)
+_ONE = np.uint64(1)
+
+
+def _popcount(values):
+    # Number of set bits of every uint64 in the array
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).astype(np.int64)
+    values = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    values = (values & np.uint64(0x3333333333333333)) + ((values >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    values = (values + (values >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((values * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+
+def batch_moves(own, opp):
+    """Returns the legal move masks of every game for the side owning `own`."""
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for shift, mask, up in _SHIFTS:
+        o = opp & mask
+        if up:
+            x = (own << shift) & o
+            for _ in _FILL_STEPS:
+                x |= (x << shift) & o
+            moves |= (x << shift) & mask
+        else:
+            x = (own >> shift) & o
+            for _ in _FILL_STEPS:
+                x |= (x >> shift) & o
+            moves |= (x >> shift) & mask
+    return moves & empty
+
+
+def batch_flips(move, own, opp):
+    """Returns the discs flipped in every game by playing its single-bit `move` (0 for no move)."""
+    flips = np.zeros_like(own)
+    for shift, mask, up in _SHIFTS:
+        o = opp & mask
+        if up:
+            line = (move << shift) & o
+            for _ in _FILL_STEPS:
+                line |= (line << shift) & o
+            closed = (line << shift) & mask & own
+        else:
+            line = (move >> shift) & o
+            for _ in _FILL_STEPS:
+                line |= (line >> shift) & o
+            closed = (line >> shift) & mask & own
+        flips |= np.where(closed != 0, line, np.uint64(0))
+    return flips
+
+
+def _pick_random_bits(masks, generator):
+    # Pick one set bit uniformly at random from every non-zero mask (0 for empty masks)
+    little_endian = masks.astype('<u8', copy=False)
+    bits = np.unpackbits(little_endian.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    counts = bits.sum(axis=1, dtype=np.int64)
+    picks = np.floor(generator.random(len(masks)) * counts).astype(np.int64)
+    index = np.argmax(bits.cumsum(axis=1) > picks[:, None], axis=1).astype(np.uint64)
+    return np.where(counts > 0, _ONE << index, np.uint64(0))
+
+
+class BatchRollout:
+    """
+    Plays batches of random games to the end.
+
+    Args:
+        seed (int, optional): Seed of the batch's own NumPy generator.
+    """
+
+    def __init__(self, seed=None):
+        self.generator = np.random.default_rng(seed)
+
+    def playout(self, black, white, color, count):
+        """
+        Plays `count` random games from the same position, passing when forced.
+
+        Args:
+            black (int): The black bitboard.
+            white (int): The white bitboard.
+            color (str): The player to move ('B' or 'W').
+            count (int): The number of games.
+
+        Returns:
+            tuple: Arrays with the final black and white disc counts of every game.
+        """
+        first, second = (black, white) if color == 'B' else (white, black)
+        own = np.full(count, first, dtype=np.uint64)
+        opp = np.full(count, second, dtype=np.uint64)
+        passes = np.zeros(count, dtype=np.int8)
+        own_is_black = color == 'B'
+
+        while True:
+            moves = batch_moves(own, opp)
+            has_move = moves != 0
+            passes = np.where(has_move, 0, passes + 1)
+            if not (passes < 2).any():
+                break
+            move = _pick_random_bits(moves, self.generator)
+            flips = batch_flips(move, own, opp)
+            own, opp = opp & ~flips, own | move | flips
+            own_is_black = not own_is_black
+
+        black_discs, white_discs = (own, opp) if own_is_black else (opp, own)
+        return _popcount(black_discs), _popcount(white_discs)
+
+    def playout_stats(self, black, white, color, count):
+        """Plays `count` random games like `playout` and returns (black wins, white wins, draws)."""
+        black_counts, white_counts = self.playout(black, white, color, count)
+        black_wins = int((black_counts > white_counts).sum())
+        white_wins = int((white_counts > black_counts).sum())
+        return black_wins, white_wins, count - black_wins - white_wins
+
+
+def benchmark(batch=256, games=2048, seed=0):
+    """Prints playouts per second of the scalar `mcts.random_playout` and of `BatchRollout`."""
+    import mcts
+
+    board = Board()
+    rng = random.Random(seed)
+    scalar_games = max(1, games // 8)
+    start = time.perf_counter()
+    for _ in range(scalar_games):
+        mcts.random_playout(board.black, board.white, 'B', geometry(8), rng)
+    scalar_rate = scalar_games / (time.perf_counter() - start)
+
+    rollout = BatchRollout(seed)
+    played = 0
+    start = time.perf_counter()
+    while played < games:
+        rollout.playout(board.black, board.white, 'B', batch)
+        played += batch
+    batch_rate = played / (time.perf_counter() - start)
+
+    print(f"scalar: {scalar_rate:10.0f} playouts/s")
+    print(f"batch:  {batch_rate:10.0f} playouts/s (batch of {batch})")
+    print(f"speedup: {batch_rate / scalar_rate:.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark batched NumPy playouts against scalar ones.")
+    parser.add_argument('--batch', type=int, default=256)
+    parser.add_argument('--games', type=int, default=2048)
+    args = parser.parse_args()
+    benchmark(args.batch, args.games)
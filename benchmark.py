@@ -0,0 +1,365 @@
+"""
+Benchmarks for the board, the searches and the agents on a fixed corpus of positions.
+
+Every benchmark is timed over `--repeat` runs of at least `MIN_RUN_TIME` seconds each, and its
+fastest run counts. Besides the time, it records a digest of what it computed (moves, scores,
+playout results), so a change in behaviour shows up as well as a change in speed.
+
+Two files are compared against:
+    benchmark_reference.json   shipped with the code: the digests every machine must reproduce
+                               (its timings are for information only)
+    benchmark_baseline.json    this machine's timings, recorded with --save and not committed
+
+A benchmark whose digest differs from either, or whose fastest run is more than `--tolerance`
+slower than the baseline, is a regression and the script exits with status 1. Without a
+baseline only the results are checked. Record one with `--save` before changing anything.
+
+Usage:
+    python benchmark.py [--filter minimax] [--repeat 5] [--tolerance 0.5] [--save]
+                        [--save-reference] [--output results.json]
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+
+import mcts
+from board import Board, geometry
+from expectimax import evaluation_bounds, expectimax
+from minimax import evaluate_board, minimax
+from perft import KNOWN_COUNTS, perft
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Timings of this machine, recorded with --save; not part of the repository
+DEFAULT_BASELINE_PATH = os.path.join(_HERE, 'benchmark_baseline.json')
+# The results (not the timings) every machine must reproduce, recorded with --save-reference
+DEFAULT_REFERENCE_PATH = os.path.join(_HERE, 'benchmark_reference.json')
+REFERENCE_NOTE = ("Reference only: compare the result digests. The timings were measured on one machine and are "
+                  "not a baseline for any other; record your own with 'python benchmark.py --save'.")
+
+# (black, white, player to move), from random games of increasing length, opening to endgame
+CORPUS = (
+    (0x0000101020400000, 0x0000080818000000, 'B'),  # 56 empty, 6 moves
+    (0x4020141c1c000000, 0x0008202000000000, 'W'),  # 51 empty, 5 moves
+    (0x1001020408100000, 0x08083c1810200000, 'B'),  # 48 empty, 9 moves
+    (0x000408841e000000, 0x00f0307a80080000, 'W'),  # 43 empty, 9 moves
+    (0x0060300960400000, 0x08050e3418304800, 'B'),  # 40 empty, 14 moves
+    (0x004818285e3c3000, 0x00106092a0c08800, 'W'),  # 35 empty, 17 moves
+    (0x0825222c14202302, 0x000000130b1f1c18, 'B'),  # 32 empty, 4 moves
+    (0x0484a0b448082000, 0x2063074932364ae0, 'W'),  # 27 empty, 12 moves
+    (0x20752c1178642041, 0x1202124a07101f14, 'B'),  # 24 empty, 11 moves
+    (0xf170900207040004, 0x0087667df8709e11, 'W'),  # 19 empty, 6 moves
+    (0x0000040c1ce5467f, 0x532d1b72e31a3800, 'B'),  # 16 empty, 10 moves
+    (0x08346a1f325ffef2, 0xe74890e0cca00000, 'W'),  # 11 empty, 11 moves
+    (0x0247a293af1e0c26, 0x7d385c6c50e0f288, 'B'),  # 8 empty, 7 moves
+    (0x797a051804260080, 0x8284fae7fbd9fd7f, 'W'),  # 3 empty, 3 moves
+)
+
+# The midgame positions the searches run on; deep full-width searches of all of them take too long
+SEARCH_POSITIONS = (2, 4, 6, 8)
+
+# Passes over the corpus per run of the micro-benchmarks, so a run takes a measurable time
+MICRO_LOOPS = 200
+
+# Every run calls a benchmark until it has spent at least this many seconds in it
+MIN_RUN_TIME = 0.2
+
+# Slow benchmarks stop repeating once their runs add up to this many seconds
+TIME_BUDGET = 5.0
+
+# Allowed slowdown of the fastest run against the baseline before it counts as a regression; on a
+# shared machine the fastest runs of an unchanged tree still move by up to about 30% between invocations
+DEFAULT_TOLERANCE = 0.5
+
+
+def corpus_positions(indices=None):
+    """Returns fresh (board, color) pairs for the corpus, or for the given corpus indices."""
+    entries = CORPUS if indices is None else [CORPUS[index] for index in indices]
+    return [(Board.from_bitboards(black, white), color) for black, white, color in entries]
+
+
+def digest(value):
+    """Returns a short, stable fingerprint of a benchmark's result."""
+    return hashlib.sha256(repr(value).encode('ascii')).hexdigest()[:16]
+
+
+# Every benchmark is set up untimed and returns (work, units): `work()` is the timed part and
+# returns the result to fingerprint, `units` how many operations one call performs.
+
+def bench_get_valid_moves():
+    # Fresh boards, so the per-position move cache starts cold
+    boards = [(Board.from_bitboards(black, white), color)
+              for _ in range(MICRO_LOOPS) for black, white, color in CORPUS]
+
+    def work():
+        return sum(len(board.get_valid_moves(color)) for board, color in boards)
+    return work, len(boards)
+
+
+def bench_place_disc():
+    plays = []
+    for board, color in corpus_positions():
+        moves = board.get_valid_moves(color)
+        for _ in range(MICRO_LOOPS // 10):
+            for row, col in moves:
+                plays.append((board.copy(), row, col, color))
+
+    def work():
+        for board, row, col, color in plays:
+            board.place_disc(row, col, color)
+        return sum(board.black.bit_count() for board, _, _, _ in plays)
+    return work, len(plays)
+
+
+def bench_copy():
+    boards = [board for board, _ in corpus_positions()] * MICRO_LOOPS
+
+    def work():
+        for board in boards:
+            board.copy()
+    return work, len(boards)
+
+
+def bench_perft():
+    board = Board()
+
+    def work():
+        return perft(board, 'B', 7)
+    return work, KNOWN_COUNTS[7]
+
+
+def make_minimax_benchmark(depth, use_pruning):
+    def bench():
+        positions = corpus_positions(SEARCH_POSITIONS)
+
+        def work():
+            return [minimax(board, depth, True, color, use_pruning) for board, color in positions]
+        return work, len(positions)
+    return bench
+
+
+def make_expectimax_benchmark(depth, pruning):
+    def bench():
+        positions = corpus_positions(SEARCH_POSITIONS)
+        bounds = evaluation_bounds(evaluate_board) if pruning else None
+
+        def work():
+            return [expectimax(board, depth, True, color, bounds=bounds) for board, color in positions]
+        return work, len(positions)
+    return bench
+
+
+def bench_mcts_playouts():
+    positions = corpus_positions()[:-1]
+    geo = geometry(8)
+    games = 40
+
+    def work():
+        rng = random.Random(0)
+        return [mcts.random_playout(board.black, board.white, color, geo, rng)
+                for _ in range(games) for board, color in positions]
+    return work, games * len(positions)
+
+
+def bench_mcts_search():
+    positions = corpus_positions(SEARCH_POSITIONS)
+    simulations = 250
+
+    def work():
+        rng = random.Random(0)
+        results = []
+        for board, color in positions:
+            geo = geometry(board.size)
+            root = mcts.Node(None, color, None, mcts.untried_moves(board.black, board.white, color, geo))
+            mcts.search(root, board.black, board.white, simulations, board.size, rng)
+            results.append(root.most_visited_child().move)
+        return results
+    return work, simulations * len(positions)
+
+
+# name -> (setup, unit of the rate)
+BENCHMARKS = {
+    'board.get_valid_moves': (bench_get_valid_moves, 'positions'),
+    'board.place_disc': (bench_place_disc, 'moves'),
+    'board.copy': (bench_copy, 'copies'),
+    'board.perft7': (bench_perft, 'leaves'),
+}
+for _depth in range(1, 6):
+    BENCHMARKS[f'minimax.depth{_depth}'] = (make_minimax_benchmark(_depth, False), 'searches')
+    BENCHMARKS[f'minimax.depth{_depth}.pruning'] = (make_minimax_benchmark(_depth, True), 'searches')
+del _depth
+BENCHMARKS['expectimax.depth3'] = (make_expectimax_benchmark(3, False), 'searches')
+BENCHMARKS['expectimax.depth3.pruning'] = (make_expectimax_benchmark(3, True), 'searches')
+BENCHMARKS['mcts.playouts'] = (bench_mcts_playouts, 'playouts')
+BENCHMARKS['mcts.search'] = (bench_mcts_search, 'simulations')
+
+
+def _timed_run(setup):
+    # One run: calls the benchmark until MIN_RUN_TIME is spent in its timed part, and returns
+    # the mean seconds per call, the seconds spent, the operations per call and the last result
+    calls = 0
+    elapsed = 0.0
+    while calls == 0 or elapsed < MIN_RUN_TIME:
+        work, units = setup()
+        # Like timeit, keep the collector from firing at random points inside the timed part
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = work()
+            elapsed += time.perf_counter() - start
+        finally:
+            gc.enable()
+        calls += 1
+    return elapsed / calls, elapsed, units, result
+
+
+def run_benchmarks(names, repeat=5):
+    """
+    Times benchmarks over `repeat` runs each; a benchmark stops early once its runs exceed
+    `TIME_BUDGET` seconds.
+
+    Like `timeit.Timer.autorange`, a run calls the benchmark as many times as it takes to spend
+    at least `MIN_RUN_TIME` seconds in the timed part, so millisecond benchmarks are not at the
+    mercy of timer resolution. The runs are interleaved, one run of every benchmark per round,
+    so a stretch of time in which the machine is slow does not hit all runs of one benchmark.
+
+    Args:
+        names (list): Keys of `BENCHMARKS`.
+        repeat (int): How many runs to time per benchmark at most.
+
+    Returns:
+        dict: Maps each name to the fastest and the median time per call in seconds (the fastest
+        is compared with baselines), the operations per call, the rate per second and the result
+        digest.
+    """
+    runs = {name: [] for name in names}
+    spent = dict.fromkeys(names, 0.0)
+    outcomes = {}
+    for _ in range(repeat):
+        for name in names:
+            if spent[name] > TIME_BUDGET:
+                continue
+            per_call, elapsed, units, result = _timed_run(BENCHMARKS[name][0])
+            runs[name].append(per_call)
+            spent[name] += elapsed
+            outcomes[name] = units, result
+
+    results = {}
+    for name in names:
+        best = min(runs[name])
+        units, result = outcomes[name]
+        results[name] = {
+            'seconds': round(best, 7),
+            'median': round(statistics.median(runs[name]), 7),
+            'runs': len(runs[name]),
+            'units': units,
+            'unit': BENCHMARKS[name][1],
+            'rate': round(units / best, 1) if best else None,
+            'result': digest(result),
+        }
+    return results
+
+
+def compare(results, baseline, reference=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares benchmark results with the timings of a baseline and the results of a reference.
+
+    Args:
+        results (dict): Maps benchmark names to `run_benchmarks` results.
+        baseline (dict): The same for baselines recorded on this machine; only their fastest
+            times are compared, as timings from elsewhere say nothing about this machine.
+        reference (dict, optional): The same for the reference results shipped with the code;
+            only their digests are compared, which do not depend on the machine.
+        tolerance (float): The allowed slowdown, as a fraction of the baseline time.
+
+    Returns:
+        dict: Maps every benchmark name to its status: 'ok', 'faster', 'slower' (a time
+        regression), 'changed' (a different result) or 'new' (no baseline).
+    """
+    statuses = {}
+    for name, result in results.items():
+        expected = baseline.get(name)
+        digests = {entry[name]['result'] for entry in (baseline, reference or {}) if name in entry}
+        if digests - {result['result']}:
+            statuses[name] = 'changed'
+        elif expected is None:
+            statuses[name] = 'new'
+        elif result['seconds'] > expected['seconds'] * (1 + tolerance):
+            statuses[name] = 'slower'
+        elif result['seconds'] < expected['seconds'] / (1 + tolerance):
+            statuses[name] = 'faster'
+        else:
+            statuses[name] = 'ok'
+    return statuses
+
+
+def load_results(path):
+    """Returns the results stored at `path` by `save_results`, or an empty dict if there are none."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as handle:
+        return json.load(handle)['benchmarks']
+
+
+def save_results(results, path, note=None):
+    """Stores `results`, with the Python version and machine they were measured on."""
+    header = {'python': platform.python_version(), 'machine': platform.machine()}
+    if note is not None:
+        header['note'] = note
+    with open(path, 'w') as handle:
+        json.dump({**header, 'benchmarks': results}, handle, indent=2, sort_keys=True)
+        handle.write('\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the board, the searches and the agents.")
+    parser.add_argument('--filter', default='', help="Only run benchmarks whose name matches this regex")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown against the baseline, as a fraction")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="Timings recorded on this machine")
+    parser.add_argument('--reference', default=DEFAULT_REFERENCE_PATH, help="Expected results of every benchmark")
+    parser.add_argument('--save', action='store_true', help="Store the results as this machine's baselines")
+    parser.add_argument('--save-reference', action='store_true',
+                        help="Store the results as the reference, after an intended change of behaviour")
+    parser.add_argument('--output', help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if re.search(args.filter, name)]
+    baseline = load_results(args.baseline)
+    reference = load_results(args.reference)
+    if not baseline:
+        print(f"No baselines in {args.baseline}, only checking results; record them with --save", file=sys.stderr)
+    results = run_benchmarks(names, args.repeat)
+    statuses = compare(results, baseline, reference, args.tolerance)
+
+    for name in names:
+        result = results[name]
+        line = f"{name:28} {result['seconds'] * 1000:10.3f} ms {result['rate']:14.1f} {result['unit']}/s"
+        if name in baseline:
+            change = result['seconds'] / baseline[name]['seconds'] - 1
+            line += f"  {change:+7.1%}"
+        print(f"{line}  {statuses[name]}")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+    if args.save_reference:
+        save_results({**reference, **results}, args.reference, REFERENCE_NOTE)
+        print(f"Saved reference results to {args.reference}")
+    if args.save:
+        # Keep the baselines of benchmarks that were filtered out
+        save_results({**baseline, **results}, args.baseline)
+        print(f"Saved baselines to {args.baseline}")
+    elif not args.save_reference and any(status in ('slower', 'changed') for status in statuses.values()):
+        regressions = [name for name, status in statuses.items() if status in ('slower', 'changed')]
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
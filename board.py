@@ -1,16 +1,447 @@
+import random
+from collections import namedtuple
+from functools import lru_cache
+
+DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)]
+
+
+# Undo information returned by `Board.make_move`: the mover's colour, the bit of the square
+# played and the bitboard of discs that were flipped.
+MoveRecord = namedtuple('MoveRecord', ['color', 'move', 'flips'])
+
+
+class _Geometry:
+    """
+    Precomputed bit masks for an n x n bitboard, where square (row, col) is bit row * n + col.
+
+    Every direction is stored as a shift amount together with the mask that has to be applied
+    after shifting, so that discs never wrap around from one edge of the board to the other.
+    Directions moving towards higher bits are kept apart from those moving towards lower bits
+    so the hot loops never have to branch on the sign of the shift.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.squares = size * size
+        self.full = (1 << self.squares) - 1
+
+        first_col = 0
+        for row in range(size):
+            first_col |= 1 << (row * size)
+        last_col = first_col << (size - 1)
+
+        self.up_shifts = []
+        self.down_shifts = []
+        for dr, dc in DIRECTIONS:
+            shift = dr * size + dc
+            if dc == 1:
+                mask = self.full & ~first_col
+            elif dc == -1:
+                mask = self.full & ~last_col
+            else:
+                mask = self.full
+            if shift > 0:
+                self.up_shifts.append((shift, mask))
+            else:
+                self.down_shifts.append((-shift, mask))
+
+        # A line of opponent discs between two own discs is at most size - 2 long
+        self.fill_steps = range(size - 3)
+
+        # Squares weighted by the evaluation: the four corners, and the edges without them
+        last = size - 1
+        self.corners = (1 | 1 << last | 1 << (last * size) | 1 << (last * size + last))
+        first_row = (1 << size) - 1
+        self.edges = (first_row | first_row << (last * size) | first_col | last_col) & ~self.corners
+
+        # Zobrist keys come from a fixed seed so hashes agree across processes and runs
+        rng = random.Random(0x0DE110 + size)
+        self.black_keys = [rng.getrandbits(64) for _ in range(self.squares)]
+        self.white_keys = [rng.getrandbits(64) for _ in range(self.squares)]
+        self.side_key = rng.getrandbits(64)
+
+        # Flipping a disc toggles both colour keys of its square; precompute that per byte
+        # of the flip mask so a whole flip set is hashed with one lookup per byte.
+        self.flip_keys = []
+        for base in range(0, self.squares, 8):
+            table = [0] * 256
+            for value in range(1, 256):
+                low = value & -value
+                square = base + low.bit_length() - 1
+                toggle = self.black_keys[square] ^ self.white_keys[square] if square < self.squares else 0
+                table[value] = table[value ^ low] ^ toggle
+            self.flip_keys.append(table)
+
+        # The same per-byte tables for the discs of one colour, to hash whole positions quickly
+        self.black_byte_keys = self._byte_key_tables(self.black_keys)
+        self.white_byte_keys = self._byte_key_tables(self.white_keys)
+
+        # symmetry_squares[s][i] is the square that square i is moved to by symmetry s
+        self.symmetry_squares = []
+        for symmetry in SYMMETRIES:
+            images = []
+            for index in range(self.squares):
+                row, col = transform_square(index // size, index % size, symmetry, size)
+                images.append(row * size + col)
+            self.symmetry_squares.append(images)
+
+    def _byte_key_tables(self, keys):
+        tables = []
+        for base in range(0, self.squares, 8):
+            table = [0] * 256
+            for value in range(1, 256):
+                low = value & -value
+                square = base + low.bit_length() - 1
+                table[value] = table[value ^ low] ^ (keys[square] if square < self.squares else 0)
+            tables.append(table)
+        return tables
+
+    def disc_key(self, black, white):
+        # Return the Zobrist hash of the discs on the given bitboards
+        key = 0
+        for black_table, white_table in zip(self.black_byte_keys, self.white_byte_keys):
+            if not (black or white):
+                break
+            key ^= black_table[black & 0xFF] ^ white_table[white & 0xFF]
+            black >>= 8
+            white >>= 8
+        return key
+
+    def flip_key(self, flips):
+        # Return the XOR of the toggle keys of every square in `flips`
+        key = 0
+        for table in self.flip_keys:
+            if not flips:
+                break
+            key ^= table[flips & 0xFF]
+            flips >>= 8
+        return key
+
+
+# The 8 symmetries of the square board, numbered by three bits: symmetry s first mirrors the
+# columns if bit 0 is set, then mirrors the rows if bit 1 is set, then swaps rows and columns if
+# bit 2 is set. Symmetry 0 is the identity.
+SYMMETRIES = range(8)
+
+
+def transform_square(row, col, symmetry, size=8):
+    """Return the square that (row, col) is moved to by `symmetry`."""
+    if symmetry & 1:
+        col = size - 1 - col
+    if symmetry & 2:
+        row = size - 1 - row
+    if symmetry & 4:
+        row, col = col, row
+    return row, col
+
+
+def inverse_symmetry(symmetry):
+    """Return the symmetry that undoes `symmetry`."""
+    return _INVERSE_SYMMETRIES[symmetry]
+
+
+# Mirrors and transposes are their own inverses; a transpose after mirroring the columns is
+# undone by transposing first and then mirroring the rows, and vice versa.
+_INVERSE_SYMMETRIES = [0, 1, 2, 3, 4, 6, 5, 7]
+
+_K1 = 0x5555555555555555
+_K2 = 0x3333333333333333
+_K4 = 0x0F0F0F0F0F0F0F0F
+_D1 = 0x5500550055005500
+_D2 = 0x3333000033330000
+_D4 = 0x0F0F0F0F00000000
+
+
+def _mirror_columns8(mask):
+    # Reverse the bits of every byte (row) of an 8x8 bitboard
+    mask = ((mask >> 1) & _K1) | ((mask & _K1) << 1)
+    mask = ((mask >> 2) & _K2) | ((mask & _K2) << 2)
+    return ((mask >> 4) & _K4) | ((mask & _K4) << 4)
+
+
+def _mirror_rows8(mask):
+    # Reverse the order of the bytes (rows) of an 8x8 bitboard
+    return int.from_bytes(mask.to_bytes(8, 'little'), 'big')
+
+
+def _transpose8(mask):
+    # Swap rows and columns of an 8x8 bitboard with three delta swaps
+    t = _D4 & (mask ^ (mask << 28))
+    mask ^= t ^ (t >> 28)
+    t = _D2 & (mask ^ (mask << 14))
+    mask ^= t ^ (t >> 14)
+    t = _D1 & (mask ^ (mask << 7))
+    return mask ^ t ^ (t >> 7)
+
+
+def _permute(mask, squares):
+    # Move every set bit of `mask` to the square given by `squares`
+    result = 0
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        result |= 1 << squares[low.bit_length() - 1]
+    return result
+
+
+def transform_mask(mask, symmetry, size=8):
+    """Return the bitboard `mask` transformed by `symmetry`."""
+    if size != 8:
+        return _permute(mask, geometry(size).symmetry_squares[symmetry])
+    if symmetry & 1:
+        mask = _mirror_columns8(mask)
+    if symmetry & 2:
+        mask = _mirror_rows8(mask)
+    if symmetry & 4:
+        mask = _transpose8(mask)
+    return mask
+
+
+def symmetric_masks(mask, size=8):
+    """Return the list of the 8 images of `mask`, indexed by symmetry."""
+    if size != 8:
+        return [_permute(mask, squares) for squares in geometry(size).symmetry_squares]
+    images = [mask, _mirror_columns8(mask)]
+    images += [_mirror_rows8(image) for image in images]
+    images += [_transpose8(image) for image in images]
+    return images
+
+
+# The 8x8 masks repeated in both halves of a 128-bit integer holding two bitboards
+_LOW64 = (1 << 64) - 1
+_K1W, _K2W, _K4W = (_K1 << 64 | _K1), (_K2 << 64 | _K2), (_K4 << 64 | _K4)
+_D1W, _D2W, _D4W = (_D1 << 64 | _D1), (_D2 << 64 | _D2), (_D4 << 64 | _D4)
+
+
+def _symmetric_pairs8(pair):
+    # The 8 images of two 8x8 bitboards packed as first << 64 | second; every shift and mask of
+    # the 64-bit transforms stays within its half, so both boards are transformed at once
+    mirrored = ((pair >> 1) & _K1W) | ((pair & _K1W) << 1)
+    mirrored = ((mirrored >> 2) & _K2W) | ((mirrored & _K2W) << 2)
+    mirrored = ((mirrored >> 4) & _K4W) | ((mirrored & _K4W) << 4)
+    images = [pair, mirrored]
+    for image in (pair, mirrored):
+        # Reversing all 16 bytes also swaps the two halves, so swap them back
+        image = int.from_bytes(image.to_bytes(16, 'little'), 'big')
+        images.append((image & _LOW64) << 64 | image >> 64)
+    for image in images[:4]:
+        t = _D4W & (image ^ (image << 28))
+        image ^= t ^ (t >> 28)
+        t = _D2W & (image ^ (image << 14))
+        image ^= t ^ (t >> 14)
+        t = _D1W & (image ^ (image << 7))
+        images.append(image ^ t ^ (t >> 7))
+    return images
+
+
+def canonical_form(first, second, size=8):
+    """
+    Return the canonical representative of a pair of bitboards under the 8 symmetries: the
+    transformed (first, second) pair that compares smallest, and the symmetry that produced it.
+    When several symmetries give the same pair, the lowest-numbered one is returned.
+    """
+    if size == 8:
+        images = _symmetric_pairs8(first << 64 | second)
+        best = min(images)
+        return best >> 64, best & _LOW64, images.index(best)
+    squares = size * size
+    images = [first_image << squares | second_image for first_image, second_image
+              in zip(symmetric_masks(first, size), symmetric_masks(second, size))]
+    best = min(images)
+    return best >> squares, best & ((1 << squares) - 1), images.index(best)
+
+
+@lru_cache(maxsize=None)
+def geometry(size):
+    """Return the shared `_Geometry` for boards of the given size."""
+    return _Geometry(size)
+
+
+def square_bit(row, col, size=8):
+    """Return the bitboard mask of square (row, col)."""
+    return 1 << (row * size + col)
+
+
+def iter_squares(mask, size=8):
+    """Yield the (row, col) squares set in a bitboard mask, in row-major order."""
+    while mask:
+        low = mask & -mask
+        index = low.bit_length() - 1
+        yield divmod(index, size)
+        mask ^= low
+
+
+def moves_mask(own, opp, geo):
+    """
+    Return the bitboard of legal moves for the side owning `own` against `opp`.
+
+    This and `flips_mask` are the raw kernels behind `Board`; searches that keep their own
+    (own, opp) pairs, like the endgame solver, call them directly.
+    """
+    empty = geo.full & ~(own | opp)
+    steps = geo.fill_steps
+    moves = 0
+
+    for shift, mask in geo.up_shifts:
+        o = opp & mask
+        x = (own << shift) & o
+        for _ in steps:
+            x |= (x << shift) & o
+        moves |= (x << shift) & mask
+    for shift, mask in geo.down_shifts:
+        o = opp & mask
+        x = (own >> shift) & o
+        for _ in steps:
+            x |= (x >> shift) & o
+        moves |= (x >> shift) & mask
+
+    return moves & empty
+
+
+def flips_mask(move, own, opp, geo):
+    """Return the discs flipped by playing the single-bit `move`, which must be an empty square."""
+    flips = 0
+    for shift, mask in geo.up_shifts:
+        x = (move << shift) & mask
+        line = 0
+        while x & opp:
+            line |= x
+            x = (x << shift) & mask
+        if x & own:
+            flips |= line
+    for shift, mask in geo.down_shifts:
+        x = (move >> shift) & mask
+        line = 0
+        while x & opp:
+            line |= x
+            x = (x >> shift) & mask
+        if x & own:
+            flips |= line
+    return flips
+
+
 class Board:
+    """
+    An Othello board stored as two bitboards, one for the black and one for the white discs.
+
+    `zobrist` holds a 64-bit Zobrist hash of the discs on the board. It is updated incrementally
+    by every move and does not include the side to move; use `hash_key` for that.
+
+    Legal moves are memoized per position: `valid_moves_mask` and `get_valid_moves` compute each
+    side's moves at most once until the position changes, so the game loop, the search and the
+    evaluation can all ask again for free.
+
+    The classic list-of-lists view of the position (`'B'`, `'W'` or `None` per square) is still
+    available through the `board` attribute. It is built lazily from the bitboards the first
+    time it is read after a move, and assigning a new grid to it reloads the bitboards. The
+    view is a snapshot: mutate the position through `place_disc`, not by writing into the grid.
+    """
+
     def __init__(self, size=8):
         self.size = size
-        self.board = [[None for _ in range(size)] for _ in range(size)]
+        self._geometry = geometry(size)
+        self.black = 0
+        self.white = 0
+        self.zobrist = 0
+        self._grid = None
+        self._move_masks = {}
+        self._move_lists = {}
         self._initialize_board()
 
+    @classmethod
+    def from_bitboards(cls, black, white, size=8):
+        """Create a board holding the given black and white bitboards."""
+        board = cls(size)
+        board.black = black
+        board.white = white
+        board._reset_derived_state()
+        return board
+
     def _initialize_board(self):
         # Set up the initial four discs in the center
         mid = self.size // 2
-        self.board[mid-1][mid-1] = 'W'
-        self.board[mid][mid] = 'W'
-        self.board[mid-1][mid] = 'B'
-        self.board[mid][mid-1] = 'B'
+        self.white = square_bit(mid - 1, mid - 1, self.size) | square_bit(mid, mid, self.size)
+        self.black = square_bit(mid - 1, mid, self.size) | square_bit(mid, mid - 1, self.size)
+        self._reset_derived_state()
+
+    def _reset_derived_state(self):
+        # Recompute everything derived from the bitboards after they were set wholesale
+        geo = self._geometry
+        key = 0
+        for row, col in iter_squares(self.black, self.size):
+            key ^= geo.black_keys[row * self.size + col]
+        for row, col in iter_squares(self.white, self.size):
+            key ^= geo.white_keys[row * self.size + col]
+        self.zobrist = key
+        self._position_changed()
+
+    def _position_changed(self):
+        # Drop everything memoized for the previous position, emptying the memos in place rather
+        # than allocating new ones on every move
+        self._grid = None
+        if self._move_masks:
+            self._move_masks.clear()
+        if self._move_lists:
+            self._move_lists.clear()
+
+    @property
+    def board(self):
+        # Build the list-of-lists compatibility view on demand
+        if self._grid is None:
+            size = self.size
+            grid = [[None] * size for _ in range(size)]
+            for row, col in iter_squares(self.black, size):
+                grid[row][col] = 'B'
+            for row, col in iter_squares(self.white, size):
+                grid[row][col] = 'W'
+            self._grid = grid
+        return self._grid
+
+    @board.setter
+    def board(self, grid):
+        # Load a list-of-lists position into the bitboards
+        black = white = 0
+        for row, cells in enumerate(grid):
+            for col, disc in enumerate(cells):
+                if disc == 'B':
+                    black |= square_bit(row, col, self.size)
+                elif disc == 'W':
+                    white |= square_bit(row, col, self.size)
+        self.black = black
+        self.white = white
+        self._reset_derived_state()
+
+    def hash_key(self, player_color):
+        # Return the Zobrist hash of the position with `player_color` to move
+        if player_color == 'W':
+            return self.zobrist ^ self._geometry.side_key
+        return self.zobrist
+
+    def canonical_key(self, player_color):
+        """
+        Return (key, symmetry) for the position with `player_color` to move. `key` is the
+        `hash_key` of the canonical variant of the position (see `canonical_form`), so all 8
+        symmetric variants share it, and `symmetry` maps this board onto that variant. Map a
+        move found on the canonical variant back with `transform_square(row, col,
+        inverse_symmetry(symmetry), size)`.
+        """
+        geo = self._geometry
+        black, white, symmetry = canonical_form(self.black, self.white, self.size)
+        key = geo.disc_key(black, white)
+        if player_color == 'W':
+            key ^= geo.side_key
+        return key, symmetry
+
+    def transformed(self, symmetry):
+        """Return a new board holding this position transformed by `symmetry`."""
+        return Board.from_bitboards(transform_mask(self.black, symmetry, self.size),
+                                    transform_mask(self.white, symmetry, self.size), self.size)
+
+    def discs(self, player_color):
+        # Return the (own, opponent) bitboards for the player
+        if player_color == 'B':
+            return self.black, self.white
+        return self.white, self.black
 
     def display(self):
         # Print the board state
@@ -18,73 +449,146 @@ class Board:
             print(' '.join([disc if disc else '.' for disc in row]))
         print()
 
+    def valid_moves_mask(self, player_color):
+        # Return a bitboard with every square the player may legally play on
+        mask = self._move_masks.get(player_color)
+        if mask is None:
+            own, opp = self.discs(player_color)
+            mask = self._move_masks[player_color] = moves_mask(own, opp, self._geometry)
+        return mask
+
     def get_valid_moves(self, player_color):
-        # Return a list of valid moves (row, col) for the player
-        valid_moves = []
-        for row in range(self.size):
-            for col in range(self.size):
-                if self.is_valid_move(row, col, player_color):
-                    valid_moves.append((row, col))
-        return valid_moves
+        # Return a list of valid moves (row, col) for the player; the list is the caller's to change
+        moves = self._move_lists.get(player_color)
+        if moves is None:
+            moves = tuple(iter_squares(self.valid_moves_mask(player_color), self.size))
+            self._move_lists[player_color] = moves
+        return list(moves)
+
+    def generate_moves(self, player_color):
+        """
+        Return every legal move for the player as a list of ((row, col), flips) pairs, in the
+        same order as `get_valid_moves`. `flips` is the bitboard of discs the move turns over
+        and can be handed back to `place_disc` or `make_move` to skip recomputing it.
+        """
+        size = self.size
+        moves = []
+        mask = self.valid_moves_mask(player_color)
+        while mask:
+            move = mask & -mask
+            mask ^= move
+            moves.append((divmod(move.bit_length() - 1, size), self._flips(move, player_color)))
+        return moves
+
+    def get_flips(self, row, col, player_color):
+        # Return the bitboard of discs a move on (row, col) would flip (0 if the move is illegal)
+        return self._flips(square_bit(row, col, self.size), player_color)
 
     def is_valid_move(self, row, col, player_color):
         # Check if placing a disc on (row, col) is valid
-        if self.board[row][col] is not None:
-            return False
+        return self._flips(square_bit(row, col, self.size), player_color) != 0
 
-        opponent_color = 'W' if player_color == 'B' else 'B'
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)]
+    def _flips(self, move, player_color):
+        # Return the bitboard of discs flipped by playing the single-bit `move`
+        own, opp = self.discs(player_color)
+        if move & (own | opp):
+            return 0
+        return flips_mask(move, own, opp, self._geometry)
 
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            found_opponent = False
-            while 0 <= r < self.size and 0 <= c < self.size and self.board[r][c] == opponent_color:
-                r += dr
-                c += dc
-                found_opponent = True
+    def _apply(self, move, flips, player_color):
+        # Put the `move` disc down and turn over `flips`
+        geo = self._geometry
+        if player_color == 'B':
+            self.black |= move | flips
+            self.white &= ~flips
+            self.zobrist ^= geo.black_keys[move.bit_length() - 1] ^ geo.flip_key(flips)
+        else:
+            self.white |= move | flips
+            self.black &= ~flips
+            self.zobrist ^= geo.white_keys[move.bit_length() - 1] ^ geo.flip_key(flips)
+        self._position_changed()
 
-            if found_opponent and 0 <= r < self.size and 0 <= c < self.size and self.board[r][c] == player_color:
-                return True
-        return False
-
-    def place_disc(self, row, col, player_color):
-        # Place a disc and flip opponent's discs
-        if not self.is_valid_move(row, col, player_color):
+    def place_disc(self, row, col, player_color, flips=None):
+        # Place a disc and flip opponent's discs; `flips` may come precomputed from `generate_moves`
+        move = square_bit(row, col, self.size)
+        if flips is None:
+            flips = self._flips(move, player_color)
+        if not flips:
             return False
 
-        self.board[row][col] = player_color
-        self.flip_discs(row, col, player_color)
+        self._apply(move, flips, player_color)
         return True
 
+    def make_move(self, row, col, player_color, flips=None):
+        """
+        Play a move in place and return the `MoveRecord` needed to take it back.
+
+        Unlike `copy` followed by `place_disc`, this allocates nothing but the small record,
+        which makes it the preferred way for searches to walk the game tree. Returns None
+        (leaving the board untouched) if the move is not legal. As with `place_disc`, `flips`
+        may be passed in from `generate_moves`.
+        """
+        move = square_bit(row, col, self.size)
+        if flips is None:
+            flips = self._flips(move, player_color)
+        if not flips:
+            return None
+
+        self._apply(move, flips, player_color)
+        return MoveRecord(player_color, move, flips)
+
+    def unmake_move(self, record):
+        """Take back a move previously played with `make_move`."""
+        move, flips = record.move, record.flips
+        geo = self._geometry
+        if record.color == 'B':
+            self.black &= ~(move | flips)
+            self.white |= flips
+            self.zobrist ^= geo.black_keys[move.bit_length() - 1] ^ geo.flip_key(flips)
+        else:
+            self.white &= ~(move | flips)
+            self.black |= flips
+            self.zobrist ^= geo.white_keys[move.bit_length() - 1] ^ geo.flip_key(flips)
+        self._position_changed()
+
     def flip_discs(self, row, col, player_color):
-        # Flip the opponent's discs
-        opponent_color = 'W' if player_color == 'B' else 'B'
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)]
-
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            flip_positions = []
-            while 0 <= r < self.size and 0 <= c < self.size and self.board[r][c] == opponent_color:
-                flip_positions.append((r, c))
-                r += dr
-                c += dc
-
-            if 0 <= r < self.size and 0 <= c < self.size and self.board[r][c] == player_color:
-                for rr, cc in flip_positions:
-                    self.board[rr][cc] = player_color
+        # Flip the opponent's discs enclosed by the disc already standing on (row, col)
+        move = square_bit(row, col, self.size)
+        own, _ = self.discs(player_color)
+        if not move & own:
+            return
+
+        # `_flips` expects the square to be empty, so lift the disc while tracing the lines
+        if player_color == 'B':
+            self.black ^= move
+            flips = self._flips(move, player_color)
+            self.black ^= move | flips
+            self.white &= ~flips
+        else:
+            self.white ^= move
+            flips = self._flips(move, player_color)
+            self.white ^= move | flips
+            self.black &= ~flips
+        self.zobrist ^= self._geometry.flip_key(flips)
+        self._position_changed()
 
     def is_full(self):
         # Check if the board is full
-        return all(all(cell is not None for cell in row) for row in self.board)
+        return (self.black | self.white) == self._geometry.full
 
     def get_score(self):
         # Return the score as a tuple (B_score, W_score)
-        B_score = sum(row.count('B') for row in self.board)
-        W_score = sum(row.count('W') for row in self.board)
-        return B_score, W_score
-    
+        return self.black.bit_count(), self.white.bit_count()
+
     def copy(self):
         """Create a copy of the current board state."""
-        new_board = Board(self.size)
-        new_board.board = [row[:] for row in self.board]  # Deep copy of the board
+        new_board = Board.__new__(Board)
+        new_board.size = self.size
+        new_board._geometry = self._geometry
+        new_board.black = self.black
+        new_board.white = self.white
+        new_board.zobrist = self.zobrist
+        new_board._grid = None
+        new_board._move_masks = dict(self._move_masks)
+        new_board._move_lists = dict(self._move_lists)
         return new_board
@@ -0,0 +1,245 @@
+"""
+An opening book: precomputed best moves for the first plies of the game.
+
+The builder walks every position reachable from the start in at most `plies` plies, keeps one
+position per class of the 8 board symmetries (rotations and reflections), searches each with
+`minimax` and stores the best move. Lookups find the record by binary search in the
+memory-mapped file, so nothing is loaded up front and a probe costs a few microseconds.
+
+Positions are keyed from the point of view of the player to move (own discs, opponent discs),
+reduced to their canonical variant with `board.canonical_form`, and hashed to 64 bits.
+Moves are stored in that canonical orientation and mapped back on lookup.
+
+Usage:
+    python book.py build [--plies 6] [--depth 6] [--output opening_book.bin]
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+from board import Board, canonical_form, inverse_symmetry, transform_square
+from minimax import minimax
+from ordering import MoveOrderer
+from transposition import TranspositionTable
+
+SIZE = 8
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+MAGIC = b'OBOK'
+VERSION = 1
+
+# Header: magic, format version, plies covered, search depth, record count
+HEADER = struct.Struct('<4sHBBI')
+# Record: position key, best move square (row * 8 + col, NO_MOVE if none), score for the mover
+RECORD = struct.Struct('<QBh')
+_KEY = struct.Struct('<Q')
+NO_MOVE = 0xFF
+
+
+def position_key(own, opp):
+    """
+    Returns the book key of a position and the symmetry that maps it to its canonical form.
+
+    Args:
+        own (int): The bitboard of the player to move.
+        opp (int): The bitboard of the opponent.
+
+    Returns:
+        tuple: The 64-bit key and the symmetry used (see `board.canonical_form`).
+    """
+    own, opp, symmetry = canonical_form(own, opp, SIZE)
+    digest = hashlib.blake2b(own.to_bytes(8, 'little') + opp.to_bytes(8, 'little'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little'), symmetry
+
+
+class OpeningBook:
+    """
+    A book file opened for lookups. The file is memory-mapped; call `close` (or use the book as a
+    context manager) to release it.
+
+    Args:
+        path (str, optional): The book file, by default the one shipped with the game.
+    """
+
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        with open(path, 'rb') as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.plies, self.depth, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        if version != VERSION:
+            raise ValueError(f"Unsupported opening book version {version}")
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, key):
+        # Binary search for the record with `key`; returns (move, score) or None
+        data = self._map
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            (found,) = _KEY.unpack_from(data, HEADER.size + middle * RECORD.size)
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                _, move, score = RECORD.unpack_from(data, HEADER.size + middle * RECORD.size)
+                return move, score
+        return None
+
+    def probe(self, black, white, color):
+        """
+        Looks a position up.
+
+        Args:
+            black (int): The black bitboard.
+            white (int): The white bitboard.
+            color (str): The player to move ('B' or 'W').
+
+        Returns:
+            tuple: The book move as a square index (None if the book has no move) and its
+            score for `color`, or None if the position is not in the book.
+        """
+        own, opp = (black, white) if color == 'B' else (white, black)
+        key, symmetry = position_key(own, opp)
+        entry = self._find(key)
+        if entry is None:
+            return None
+        move, score = entry
+        if move == NO_MOVE:
+            return None, score
+        row, col = transform_square(move // SIZE, move % SIZE, inverse_symmetry(symmetry), SIZE)
+        return row * SIZE + col, score
+
+    def lookup(self, board, color):
+        """Returns the book move (row, col) for `color` on `board`, or None if there is none."""
+        if board.size != SIZE:
+            return None
+        entry = self.probe(board.black, board.white, color)
+        if entry is None or entry[0] is None:
+            return None
+        return divmod(entry[0], SIZE)
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def opening_positions(plies):
+    """
+    Returns one (board, color) per symmetry class of the positions reachable from the start in
+    at most `plies` plies, keyed by `position_key`. A player without moves passes.
+    """
+    positions = {}
+    frontier = [(Board(), 'B')]
+    for ply in range(plies + 1):
+        next_frontier = []
+        for board, color in frontier:
+            moves = board.get_valid_moves(color)
+            other = 'W' if color == 'B' else 'B'
+            if not moves:
+                if board.get_valid_moves(other):
+                    next_frontier.append((board, other))
+                continue
+            key, _ = position_key(*board.discs(color))
+            if key in positions:
+                continue
+            positions[key] = (board, color)
+            if ply == plies:
+                continue
+            for row, col in moves:
+                child = board.copy()
+                child.place_disc(row, col, color)
+                next_frontier.append((child, other))
+        frontier = next_frontier
+    return positions
+
+
+def build_book(plies=6, depth=6, evaluate=None, progress=None):
+    """
+    Searches every opening position up to `plies` plies with alpha-beta `minimax` to `depth`.
+
+    Args:
+        plies (int): How many plies from the start the book covers.
+        depth (int): The search depth per position.
+        evaluate (callable, optional): The leaf evaluation, `minimax.evaluate_board` by default.
+        progress (callable, optional): Called with (done, total) after every position.
+
+    Returns:
+        list: Sorted (key, move, score) records for `save_book`.
+    """
+    positions = opening_positions(plies)
+    table = TranspositionTable(1 << 20)
+    ordering = MoveOrderer()
+    records = []
+    for done, (key, (board, color)) in enumerate(positions.items(), 1):
+        move, score = minimax(board, depth, True, color, True, table=table, ordering=ordering, evaluate=evaluate)
+        _, symmetry = position_key(*board.discs(color))
+        if move is None:
+            square = NO_MOVE
+        else:
+            row, col = transform_square(move[0], move[1], symmetry, SIZE)
+            square = row * SIZE + col
+        records.append((key, square, max(-32768, min(32767, int(score)))))
+        if progress is not None:
+            progress(done, len(positions))
+    records.sort()
+    return records
+
+
+def save_book(records, path=DEFAULT_BOOK_PATH, plies=0, depth=0):
+    """
+    Writes sorted records to a book file: a `HEADER` followed by fixed-size `RECORD`s in
+    increasing key order.
+    """
+    with open(path, 'wb') as handle:
+        handle.write(HEADER.pack(MAGIC, VERSION, plies, depth, len(records)))
+        for record in records:
+            handle.write(RECORD.pack(*record))
+
+
+_default_book = None
+
+
+def default_book():
+    """Returns the `OpeningBook` over the shipped book file, opening it on first use."""
+    global _default_book
+    if _default_book is None:
+        _default_book = OpeningBook()
+    return _default_book
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the opening book.")
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--plies', type=int, default=6)
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--output', default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def report(done, total):
+        if done % 100 == 0 or done == total:
+            print(f"{done}/{total} positions, {time.perf_counter() - start:.0f}s", flush=True)
+
+    records = build_book(args.plies, args.depth, progress=report)
+    save_book(records, args.output, args.plies, args.depth)
+    print(f"Wrote {args.output} ({os.path.getsize(args.output)} bytes, {len(records)} positions)")
+
+    with OpeningBook(args.output) as book:
+        positions = list(opening_positions(args.plies).values())
+        start = time.perf_counter()
+        for board, color in positions:
+            book.lookup(board, color)
+        print(f"lookup: {(time.perf_counter() - start) / len(positions) * 1e6:.1f} us per position")
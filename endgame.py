@@ -0,0 +1,175 @@
+import time
+from functools import lru_cache
+
+from board import geometry, moves_mask, flips_mask
+from minimax import SearchTimeout
+
+# Players switch from heuristic search to the exact solver at this many empty squares
+DEFAULT_EMPTIES = 10
+
+# With fewer empties than this, fastest-first ordering costs more than it saves and only parity is used
+FASTEST_FIRST_EMPTIES = 7
+
+
+@lru_cache(maxsize=None)
+def quadrant_masks(size):
+    """Returns the bitboard masks of the four quadrants of a size x size board."""
+    half = size // 2
+    masks = []
+    for rows in (range(half), range(half, size)):
+        for cols in (range(half), range(half, size)):
+            mask = 0
+            for row in rows:
+                for col in cols:
+                    mask |= 1 << (row * size + col)
+            masks.append(mask)
+    return masks
+
+
+def empty_count(board):
+    """Returns the number of empty squares on the board."""
+    black, white = board.get_score()
+    return board.size * board.size - black - white
+
+
+def solve(board, player_color, stats=None, deadline=None):
+    """
+    Solves the position exactly: the final disc differential with perfect play by both sides.
+
+    Unlike `minimax`, the solver follows the real rules all the way to the end of the game,
+    including passes, so it is only practical for the last dozen or so empty squares. It first
+    runs a win/loss/draw search with the null window (-1, 1), which is much cheaper than an exact
+    search, and then searches for the exact margin only on the side of zero that result proved.
+    Moves are ordered by parity (moves into quadrants with an odd number of empties first) and,
+    away from the very end, fastest-first (moves leaving the opponent the fewest replies first).
+
+    Args:
+        board (Board): The position to solve. It is not modified.
+        player_color (str): The color of the player to move ('B' for black, 'W' for white).
+        stats (SearchStats, optional): Counts the visited nodes, finished games and cutoffs; the
+            number of empty squares is recorded as the depth.
+        deadline (float, optional): A `time.perf_counter()` value; once it passes, the solver raises
+            `minimax.SearchTimeout`.
+
+    Returns:
+        tuple: The best move (row, col), or None if the player has to pass, and the final
+               number of `player_color` discs minus the opponent's discs.
+    """
+    if stats is not None:
+        stats.depth = max(stats.depth, empty_count(board))
+    own, opp = board.discs(player_color)
+    geo = geometry(board.size)
+    quadrants = quadrant_masks(board.size)
+    squares = geo.squares
+
+    move, outcome = _root(own, opp, -1, 1, geo, quadrants, stats, deadline)
+    if outcome > 0:
+        move, outcome = _root(own, opp, 0, squares + 1, geo, quadrants, stats, deadline)
+    elif outcome < 0:
+        move, outcome = _root(own, opp, -squares - 1, 0, geo, quadrants, stats, deadline)
+
+    if move is None:
+        return None, outcome
+    return divmod(move.bit_length() - 1, board.size), outcome
+
+
+def solve_wld(board, player_color, stats=None, deadline=None):
+    """
+    Returns the best move and the game-theoretic outcome of the position for `player_color`:
+    1 for a win, 0 for a draw and -1 for a loss. See `solve`, also for `stats` and `deadline`.
+    """
+    own, opp = board.discs(player_color)
+    move, outcome = _root(own, opp, -1, 1, geometry(board.size), quadrant_masks(board.size), stats,
+                          deadline)
+    outcome = (outcome > 0) - (outcome < 0)
+    if move is None:
+        return None, outcome
+    return divmod(move.bit_length() - 1, board.size), outcome
+
+
+def _root(own, opp, alpha, beta, geo, quadrants, stats, deadline):
+    # Like `_search`, but remembers which move produced the best score
+    moves = moves_mask(own, opp, geo)
+    if not moves:
+        return None, _search(own, opp, alpha, beta, geo, quadrants, stats, deadline)
+
+    best_move = None
+    best_score = -geo.squares - 1
+    for move, flips in _ordered_moves(own, opp, moves, geo, quadrants):
+        new_own = own | move | flips
+        new_opp = opp & ~flips
+        if best_move is None:
+            score = -_search(new_opp, new_own, -beta, -alpha, geo, quadrants, stats, deadline)
+        else:
+            score = -_search(new_opp, new_own, -alpha - 1, -alpha, geo, quadrants, stats, deadline)
+            if alpha < score < beta:
+                score = -_search(new_opp, new_own, -beta, -alpha, geo, quadrants, stats, deadline)
+        if score > best_score:
+            best_score = score
+            best_move = move
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+    return best_move, best_score
+
+
+def _search(own, opp, alpha, beta, geo, quadrants, stats, deadline):
+    # Fail-soft principal variation search over raw bitboards, scores from the mover's side
+    if stats is not None:
+        stats.nodes += 1
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+
+    moves = moves_mask(own, opp, geo)
+    if not moves:
+        if not moves_mask(opp, own, geo):
+            if stats is not None:
+                stats.leaves += 1
+            return own.bit_count() - opp.bit_count()
+        return -_search(opp, own, -beta, -alpha, geo, quadrants, stats, deadline)
+
+    best_score = -geo.squares - 1
+    first = True
+    for move, flips in _ordered_moves(own, opp, moves, geo, quadrants):
+        new_own = own | move | flips
+        new_opp = opp & ~flips
+        if first:
+            score = -_search(new_opp, new_own, -beta, -alpha, geo, quadrants, stats, deadline)
+            first = False
+        else:
+            score = -_search(new_opp, new_own, -alpha - 1, -alpha, geo, quadrants, stats, deadline)
+            if alpha < score < beta:
+                score = -_search(new_opp, new_own, -beta, -alpha, geo, quadrants, stats, deadline)
+        if score > best_score:
+            best_score = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    break
+    return best_score
+
+
+def _ordered_moves(own, opp, moves, geo, quadrants):
+    # Return (move, flips) pairs, fastest-first with parity as the tie-break
+    empty = geo.full & ~(own | opp)
+    odd = 0
+    for quadrant in quadrants:
+        if (empty & quadrant).bit_count() & 1:
+            odd |= quadrant
+
+    fastest_first = empty.bit_count() >= FASTEST_FIRST_EMPTIES
+    keyed = []
+    while moves:
+        move = moves & -moves
+        moves ^= move
+        flips = flips_mask(move, own, opp, geo)
+        even = 0 if move & odd else 1
+        if fastest_first:
+            replies = moves_mask(opp & ~flips, own | move | flips, geo).bit_count()
+            keyed.append((replies, even, move, flips))
+        else:
+            keyed.append((0, even, move, flips))
+    keyed.sort()
+    return [(move, flips) for _, _, move, flips in keyed]
@@ -0,0 +1,183 @@
+"""
+Checks that the optimized searches still compute exactly what their plain counterparts do.
+
+Several searches are only correct because they return the same move and score as a simpler one:
+
+    evaluation  `minimax.evaluate_board` equals a direct re-implementation over the board grid
+    pruning     alpha-beta `minimax` equals full-width `minimax`
+    pvs         `minimax.pvs`, with and without a transposition table, equals alpha-beta `minimax`
+    star        Star1/Star2 `expectimax` (with `bounds`) equals plain `expectimax`, for both
+                evaluation functions, with and without an opponent model
+    parallel    `parallel.ParallelSearcher` equals serial `minimax`, with and without pruning
+
+Every check runs on the same random positions (from seeded random games) and reports each
+mismatch. Run it after changing any of these searches; it exits with status 1 on a mismatch.
+
+Usage:
+    python equivalence.py [--positions 20] [--seed 0] [--depth 3] [--workers 2] [--skip parallel]
+"""
+import argparse
+import random
+import sys
+import time
+
+import pattern_eval
+from board import Board
+from expectimax import evaluation_bounds, expectimax, square_weight_model
+from minimax import evaluate_board, minimax, pvs
+from parallel import ParallelSearcher
+from transposition import TranspositionTable
+
+
+def random_positions(count, seed=0):
+    """
+    Returns `count` (board, color) pairs from random games of 4 to 56 plies, with the player to
+    move having a legal move. The same seed always gives the same positions.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, color = Board(), 'B'
+        for _ in range(rng.randint(4, 56)):
+            moves = board.get_valid_moves(color)
+            if moves:
+                board.place_disc(*rng.choice(moves), color)
+            elif not board.get_valid_moves('W' if color == 'B' else 'B'):
+                break
+            color = 'W' if color == 'B' else 'B'
+        if board.get_valid_moves(color):
+            positions.append((board, color))
+    return positions
+
+
+def reference_evaluate(board, player_color):
+    # The original grid-scanning evaluation: disc difference, corners (25), edges (5) and
+    # mobility (2 per move), which the bitboard `evaluate_board` must reproduce exactly
+    grid = board.board
+    size = board.size
+    opponent_color = 'W' if player_color == 'B' else 'B'
+
+    def owner(row, col, weight):
+        if grid[row][col] == player_color:
+            return weight
+        if grid[row][col] == opponent_color:
+            return -weight
+        return 0
+
+    black, white = board.get_score()
+    score = black - white if player_color == 'B' else white - black
+    for row, col in ((0, 0), (0, size - 1), (size - 1, 0), (size - 1, size - 1)):
+        score += owner(row, col, 25)
+    for i in range(1, size - 1):
+        score += owner(0, i, 5) + owner(size - 1, i, 5) + owner(i, 0, 5) + owner(i, size - 1, 5)
+    mobility = len(board.get_valid_moves(player_color)) - len(board.get_valid_moves(opponent_color))
+    return score + 2 * mobility
+
+
+def check_evaluation(positions, depth):
+    mismatches = []
+    for index, (board, _) in enumerate(positions):
+        for color in ('B', 'W'):
+            expected, actual = reference_evaluate(board, color), evaluate_board(board, color)
+            if expected != actual:
+                mismatches.append(f"position {index} {color}: evaluate_board {actual}, reference {expected}")
+    return mismatches
+
+
+def check_pruning(positions, depth):
+    mismatches = []
+    for index, (board, color) in enumerate(positions):
+        for current in range(1, depth + 1):
+            expected = minimax(board, current, True, color, False)
+            actual = minimax(board, current, True, color, True)
+            if expected != actual:
+                mismatches.append(f"position {index} depth {current}: alpha-beta {actual}, minimax {expected}")
+    return mismatches
+
+
+def check_pvs(positions, depth):
+    mismatches = []
+    for index, (board, color) in enumerate(positions):
+        for current in range(1, depth + 2):
+            expected = minimax(board, current, True, color, True)
+            for table in (None, TranspositionTable(1 << 12)):
+                actual = pvs(board, current, color, table=table)
+                if expected != actual:
+                    mismatches.append(f"position {index} depth {current} table {table is not None}: "
+                                      f"pvs {actual}, alpha-beta {expected}")
+    return mismatches
+
+
+def check_star(positions, depth):
+    mismatches = []
+    for evaluate in (evaluate_board, pattern_eval.evaluate_board):
+        bounds = evaluation_bounds(evaluate)
+        for model in (None, square_weight_model):
+            for index, (board, color) in enumerate(positions):
+                for current in range(1, depth + 1):
+                    for maximizing in (True, False):
+                        expected = expectimax(board, current, maximizing, color, evaluate, model)
+                        actual = expectimax(board, current, maximizing, color, evaluate, model, bounds)
+                        if expected != actual:
+                            mismatches.append(
+                                f"{evaluate.__module__} model {model is not None} position {index} depth {current} "
+                                f"maximizing {maximizing}: star {actual}, expectimax {expected}")
+    return mismatches
+
+
+def check_parallel(positions, depth, workers=2):
+    mismatches = []
+    with ParallelSearcher(workers) as searcher:
+        for index, (board, color) in enumerate(positions):
+            for use_pruning in (False, True):
+                expected = minimax(board, depth, True, color, use_pruning)
+                actual = searcher.search(board, depth, color, use_pruning)
+                if expected != actual:
+                    mismatches.append(f"position {index} pruning {use_pruning}: parallel {actual}, serial {expected}")
+    return mismatches
+
+
+CHECKS = {
+    'evaluation': check_evaluation,
+    'pruning': check_pruning,
+    'pvs': check_pvs,
+    'star': check_star,
+    'parallel': check_parallel,
+}
+
+
+def run(positions, depth=3, workers=2, skip=()):
+    """
+    Runs every check not in `skip` and prints one line per check, followed by its mismatches.
+
+    Returns:
+        bool: True if no check found a mismatch.
+    """
+    passed = True
+    for name, check in CHECKS.items():
+        if name in skip:
+            continue
+        start = time.perf_counter()
+        if name == 'parallel':
+            mismatches = check(positions, depth, workers)
+        else:
+            mismatches = check(positions, depth)
+        status = 'ok' if not mismatches else f"{len(mismatches)} mismatches"
+        print(f"{name:12} {status:16} {time.perf_counter() - start:7.2f}s", flush=True)
+        for mismatch in mismatches:
+            print(f"    {mismatch}")
+        passed = passed and not mismatches
+    return passed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the optimized searches against their plain versions.")
+    parser.add_argument('--positions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=3, help="deepest search depth to compare")
+    parser.add_argument('--workers', type=int, default=2, help="worker processes for the parallel check")
+    parser.add_argument('--skip', nargs='*', default=[], choices=list(CHECKS))
+    args = parser.parse_args()
+
+    positions = random_positions(args.positions, args.seed)
+    sys.exit(0 if run(positions, args.depth, args.workers, args.skip) else 1)
@@ -0,0 +1,108 @@
+"""
+Game and agent events, and the sinks that receive them.
+
+`Game` and the agents never print directly: they call `events.emit(name, **fields)` on their
+sink. `ConsoleSink` turns events into the familiar console text, `JSONLSink` writes one JSON
+object per event, and `NullSink` drops everything, so headless runs do no formatting at all.
+`TeeSink` sends every event to several sinks, e.g. the console and a `records.GameRecordWriter`.
+
+Events and their fields:
+    game_start black, white, size, first             player names, board size and who moves first
+    board      board                                 the position before every ply
+    turn       color                                 a player is about to move
+    pass       color                                 a player had no legal move
+    no_moves   color                                 an agent was asked to move without a legal move
+    candidates color, moves                          the legal moves an agent is choosing from
+    move       color, move                           the move an agent chose
+    play       color, move                           the move the game played
+    game_over  black, white, winner, plies           final disc counts and winner ('B', 'W' or None)
+"""
+import json
+
+from board import Board
+
+
+class NullSink:
+    """Drops every event."""
+
+    def emit(self, event, **fields):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleSink:
+    """Prints events as text, the way the game always has."""
+
+    FORMATS = {
+        'turn': "{color}'s turn",
+        'pass': "No valid moves for {color}. Skipping turn.",
+        'no_moves': "{color} has no valid moves.",
+        'candidates': "valid moves:  {moves}",
+        'move': "AI ({color}) plays: {move}",
+    }
+    RESULTS = {'B': "Black wins!", 'W': "White wins!", None: "It's a tie!"}
+
+    def emit(self, event, **fields):
+        if event == 'board':
+            fields['board'].display()
+        elif event == 'game_over':
+            print(self.RESULTS[fields['winner']])
+            if fields['plies'] is not None:
+                print(fields['plies'])
+        elif event in self.FORMATS:
+            print(self.FORMATS[event].format(**fields))
+
+    def close(self):
+        pass
+
+
+class TeeSink:
+    """Sends every event to each of `sinks` in turn."""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def emit(self, event, **fields):
+        for sink in self.sinks:
+            sink.emit(event, **fields)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def _to_json(value):
+    # Boards are written as their bitboards
+    if isinstance(value, Board):
+        return {'size': value.size, 'black': value.black, 'white': value.white}
+    raise TypeError(f"Cannot serialize {type(value).__name__} in an event")
+
+
+class JSONLSink:
+    """
+    Writes every event as one JSON object per line, e.g. {"event": "move", "color": "B", "move": [2, 3]}.
+
+    Args:
+        target (str or file): A path to create, or an open text file (left open by `close`).
+    """
+
+    def __init__(self, target):
+        self._owned = isinstance(target, str)
+        self.file = open(target, 'w') if self._owned else target
+
+    def emit(self, event, **fields):
+        self.file.write(json.dumps({'event': event, **fields}, default=_to_json) + '\n')
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
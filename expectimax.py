@@ -1,8 +1,12 @@
-from board import Board
+from functools import lru_cache
+
+from minimax import evaluate_board, search_moves
+from ordering import square_priority
 from utils import raiseNotDefined
 import random
 
-def expectimax(board, depth, maximizing_player, player_color):
+def expectimax(board, depth, maximizing_player, player_color, evaluate=evaluate_board, opponent_model=None,
+               bounds=None, stats=None):
     """
     Perform the Expectimax algorithm to evaluate and choose the optimal move in a two-player game.
 
@@ -14,13 +18,26 @@ def expectimax(board, depth, maximizing_player, player_color):
     -----------
     board : Board
         The current state of the game board. It should support methods such as `is_full`, `get_valid_moves`,
-        and `place_disc`.
+        `make_move` and `unmake_move`. Moves are played on it in place and taken back before returning.
     depth : int
         The remaining depth to search. When the depth reaches 0, the algorithm stops searching further moves.
     maximizing_player : bool
         A flag to indicate whether the current node is for the maximizing player (True) or the opponent (False).
     player_color : str
         The color ('B' for black or 'W' for white) representing the player who is maximizing their score.
+    evaluate : callable, optional
+        The evaluation function for leaves, with the signature of `evaluate_board` (the default), e.g.
+        `pattern_eval.evaluate_board`.
+    opponent_model : callable, optional
+        Weights the opponent's moves at chance nodes: called as `opponent_model(board, color, moves)`, it
+        returns one positive weight per move, e.g. `square_weight_model`. By default all moves are equally
+        likely.
+    bounds : tuple, optional
+        The (lowest, highest) value `evaluate` can return, e.g. from `evaluation_bounds`. When given, the
+        search prunes chance nodes with Star1/Star2 (see `star_expectimax`) and returns the same move and
+        value as without pruning.
+    stats : SearchStats, optional
+        Counts nodes, leaves and (with `bounds`) cutoffs, and times move generation and evaluation.
 
     Returns:
     --------
@@ -40,15 +57,24 @@ def expectimax(board, depth, maximizing_player, player_color):
       board state.
     """
 
+    if bounds is not None:
+        return star_expectimax(board, depth, maximizing_player, player_color, bounds, evaluate, opponent_model,
+                               stats)
+
+    if stats is not None:
+        stats.nodes += 1
+        stats.depth = max(stats.depth, depth)
+
     if depth == 0 :
-        return None, evaluate_board(board, player_color)
-    
-    if (not board.get_valid_moves('B') and not board.get_valid_moves('W')):
-        return None, evaluate_board(board, player_color)
+        return None, evaluate(board, player_color) if stats is None else stats.leaf(evaluate, board, player_color)
     
-    valid_moves = board.get_valid_moves(player_color if maximizing_player else ('W' if player_color == 'B' else 'B'))
+    mover_color = player_color if maximizing_player else ('W' if player_color == 'B' else 'B')
+    if stats is None:
+        valid_moves = search_moves(board, mover_color)
+    else:
+        valid_moves = stats.timed('movegen', search_moves, board, mover_color)
     if not valid_moves:
-        return None, evaluate_board(board, player_color)
+        return None, evaluate(board, player_color) if stats is None else stats.leaf(evaluate, board, player_color)
     
     if maximizing_player:
 
@@ -56,9 +82,9 @@ def expectimax(board, depth, maximizing_player, player_color):
         best_move = None
 
         for move in valid_moves:
-            new_board = copy_board(board)
-            new_board.place_disc(move[0], move[1], player_color)
-            _, score = expectimax(new_board, depth-1, False, player_color)
+            record = board.make_move(move[0], move[1], player_color)
+            _, score = expectimax(board, depth-1, False, player_color, evaluate, opponent_model, stats=stats)
+            board.unmake_move(record)
 
             if score > maxScore:
                 maxScore = score
@@ -69,78 +95,254 @@ def expectimax(board, depth, maximizing_player, player_color):
     else:
         expected_value = 0
 
-        for move in valid_moves:
+        opponent_color = 'W' if player_color == 'B' else 'B'
+        weights = opponent_model(board, opponent_color, valid_moves) if opponent_model else None
+
+        for index, move in enumerate(valid_moves):
 
-            new_board = copy_board(board)
-            opponent_color = 'W' if player_color == 'B' else 'B'
-            new_board.place_disc(move[0], move[1], opponent_color)
-            _, score = expectimax(new_board, depth-1, True, player_color)
-            expected_value += score
+            record = board.make_move(move[0], move[1], opponent_color)
+            _, score = expectimax(board, depth-1, True, player_color, evaluate, opponent_model, stats=stats)
+            board.unmake_move(record)
+            if weights is None:
+                expected_value += score
+            else:
+                expected_value += weights[index] * score
             
-        return None, expected_value / len(valid_moves)
+        return None, expected_value / (len(valid_moves) if weights is None else sum(weights))
 
 
     raiseNotDefined()
 
-def evaluate_board(board, player_color):
+def copy_board(board):
+    return board.copy()
+
+
+@lru_cache(maxsize=None)
+def _square_weights(size):
+    # Static square priority plus one, so that even X squares keep a chance
+    return {square: priority + 1 for square, priority in square_priority(size).items()}
+
+
+def square_weight_model(board, color, moves):
     """
-    Evaluates the current board state for a given player by considering the score, corner occupation,
-    edge control, and mobility.
+    A cheap opponent model for `expectimax`: each move is weighted by its static square priority
+    (see `ordering.square_priority`) plus one, so a corner is five times as likely as an X square.
 
-    Args:
-        board (Board): The current game board.
-        player_color (str): The color of the player to evaluate the score for ('B' for black, 'W' for white).
+    Parameters:
+    -----------
+    board : Board
+        The position the opponent moves in.
+    color : str
+        The opponent's color.
+    moves : list
+        The opponent's legal moves.
 
     Returns:
-        int: An evaluation score where a positive value favors the player, and a negative value favors the opponent.
+    --------
+    weights : list
+        One positive weight per move.
     """
-    # Get the basic score
-    B_score, W_score = board.get_score()
-    score = W_score - B_score if player_color == 'W' else B_score - W_score
+    weights = _square_weights(board.size)
+    return [weights[move] for move in moves]
 
-    # Define opponent color
-    opponent_color = 'W' if player_color == 'B' else 'B'
-    
-    # Corner weights
-    corners = [(0, 0), (0, board.size - 1), (board.size - 1, 0), (board.size - 1, board.size - 1)]
-    corner_score = 0
-    for r, c in corners:
-        if board.board[r][c] == player_color:
-            corner_score += 25
-        elif board.board[r][c] == opponent_color:
-            corner_score -= 25
-
-    # Edge control weights
-    edge_score = 0
-    for i in range(1, board.size - 1):
-        if board.board[0][i] == player_color:
-            edge_score += 5
-        elif board.board[0][i] == opponent_color:
-            edge_score -= 5
-        if board.board[board.size - 1][i] == player_color:
-            edge_score += 5
-        elif board.board[board.size - 1][i] == opponent_color:
-            edge_score -= 5
-        if board.board[i][0] == player_color:
-            edge_score += 5
-        elif board.board[i][0] == opponent_color:
-            edge_score -= 5
-        if board.board[i][board.size - 1] == player_color:
-            edge_score += 5
-        elif board.board[i][board.size - 1] == opponent_color:
-            edge_score -= 5
-
-    # Mobility: the number of valid moves
-    player_moves = len(board.get_valid_moves(player_color))
-    opponent_moves = len(board.get_valid_moves(opponent_color))
-    mobility_score = (player_moves - opponent_moves) * 2
-
-    # Combine all scores
-    total_score = score + corner_score + edge_score + mobility_score
-    return total_score
 
+def evaluation_bounds(evaluate, size=8):
+    """
+    Returns the (lowest, highest) value of a known evaluation function, for `bounds`.
 
-def copy_board(board):
-    new_board = Board(board.size)
-    new_board.board = [row[:] for row in board.board]
-    return new_board
+    Raises ValueError for evaluation functions whose range is not known; pass their bounds explicitly.
+    """
+    import pattern_eval
+    from minimax import evaluate_board_bounds
+
+    if evaluate is evaluate_board:
+        return evaluate_board_bounds(size)
+    if evaluate is pattern_eval.evaluate_board:
+        return pattern_eval.evaluate_board_bounds()
+    raise ValueError(f"Unknown bounds for evaluation function {evaluate!r}")
+
+
+def star_expectimax(board, depth, maximizing_player, player_color, bounds, evaluate=evaluate_board,
+                    opponent_model=None, stats=None):
+    """
+    Expectimax with Star1 and Star2 pruning of chance nodes.
+
+    A chance node's value is a weighted average of its children, and every child lies within the
+    evaluation `bounds`. So after some children are known, the node's value is bracketed, and once
+    the bracket lies outside the (alpha, beta) window the remaining children can be skipped (Star1).
+    Before that, Star2 probes every child cheaply: a player node is worth at least as much as its
+    first move, and children at the search horizon are just evaluated. Those lower bounds can cut
+    the node on their own and tighten the windows of the full searches. They are skipped while beta
+    is unbounded, as it is throughout a search started with the full window: lower bounds can only
+    cut against beta.
+
+    Children are averaged in the same order and with the same arithmetic as `expectimax`, and cuts
+    are only taken with a small safety margin, so the result is exactly that of the unpruned search.
+
+    Parameters:
+    -----------
+    board, depth, maximizing_player, player_color, evaluate, opponent_model, stats :
+        As for `expectimax`.
+    bounds : tuple
+        The (lowest, highest) value `evaluate` can return.
+
+    Returns:
+    --------
+    best_move : tuple or None
+        The best move for the maximizing player, None at a chance node.
+    evaluation : float
+        The expectimax value of the position.
+    """
+    low, high = bounds
+    if stats is not None:
+        stats.depth = max(stats.depth, depth)
+    search = _StarSearch(player_color, evaluate, opponent_model, low, high, stats)
+    if maximizing_player:
+        return search.max_node(board, depth, -float('inf'), float('inf'))
+    return None, search.chance_node(board, depth, -float('inf'), float('inf'))
+
+
+class _StarSearch:
+    # The fixed parameters of one pruned search. Values outside a node's (alpha, beta) window are
+    # fail-hard bounds: alpha means "at most alpha" and beta "at least beta".
+
+    def __init__(self, player_color, evaluate, opponent_model, low, high, stats=None):
+        self.player_color = player_color
+        self.opponent_color = 'W' if player_color == 'B' else 'B'
+        self.evaluate = evaluate
+        self.opponent_model = opponent_model
+        self.low = low
+        self.high = high
+        # Cuts need to clear the window by this much, far more than any rounding error
+        self.margin = 1e-9 * (abs(low) + abs(high) + 1)
+        self.stats = stats
+
+    def leaf(self, board):
+        if self.stats is None:
+            return self.evaluate(board, self.player_color)
+        return self.stats.leaf(self.evaluate, board, self.player_color)
+
+    def cut(self, bound):
+        # Returns `bound` from a node whose remaining children were pruned
+        if self.stats is not None:
+            self.stats.cutoffs += 1
+        return bound
+
+    def is_leaf(self, board, depth, color):
+        # The nodes that `expectimax` evaluates instead of expanding
+        if depth == 0:
+            return True
+        if not board.valid_moves_mask('B') and not board.valid_moves_mask('W'):
+            return True
+        return not board.valid_moves_mask(color)
+
+    def max_node(self, board, depth, alpha, beta, first_score=None):
+        # `first_score` is the exact value of the first move when a probe already found it
+        if self.stats is not None:
+            self.stats.nodes += 1
+        if self.is_leaf(board, depth, self.player_color):
+            return None, self.leaf(board)
+
+        best_move = None
+        best_score = -float('inf')
+        for move in board.get_valid_moves(self.player_color):
+            if first_score is not None:
+                score = first_score
+                first_score = None
+            else:
+                record = board.make_move(move[0], move[1], self.player_color)
+                score = self.chance_node(board, depth - 1, max(alpha, best_score), beta)
+                board.unmake_move(record)
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if best_score >= beta:
+                return best_move, self.cut(beta)
+        return best_move, best_score
+
+    def probe(self, board, depth, alpha, beta):
+        # A lower bound of the player node: its exact value at the horizon, else its first move's value
+        if self.is_leaf(board, depth, self.player_color):
+            if self.stats is not None:
+                self.stats.nodes += 1
+            return self.leaf(board), True
+        move = board.get_valid_moves(self.player_color)[0]
+        record = board.make_move(move[0], move[1], self.player_color)
+        value = self.chance_node(board, depth - 1, alpha, beta)
+        board.unmake_move(record)
+        return value, False
+
+    def chance_node(self, board, depth, alpha, beta):
+        if self.stats is not None:
+            self.stats.nodes += 1
+        if self.is_leaf(board, depth, self.opponent_color):
+            return self.leaf(board)
+
+        valid_moves = board.get_valid_moves(self.opponent_color)
+        if self.opponent_model is None:
+            weights = [1] * len(valid_moves)
+        else:
+            weights = self.opponent_model(board, self.opponent_color, valid_moves)
+        total_weight = sum(weights)
+        low, high, margin = self.low, self.high, self.margin
+        alpha_total = alpha * total_weight
+        beta_total = beta * total_weight
+
+        # Star2 probing: lower bounds (and exact values at the horizon) for every child. Lower
+        # bounds can only cut against beta, so without one the probes would be pure overhead
+        lower = [low] * len(valid_moves)
+        upper = [high] * len(valid_moves)
+        exact = [False] * len(valid_moves)
+        first_scores = [None] * len(valid_moves)
+        lower_sum = low * total_weight
+        for index, move in enumerate(valid_moves if beta < float('inf') else ()):
+            weight = weights[index]
+            rest = lower_sum - weight * low
+            probe_beta = (beta_total - rest) / weight + margin
+            record = board.make_move(move[0], move[1], self.opponent_color)
+            value, is_exact = self.probe(board, depth - 1, low - margin, probe_beta)
+            board.unmake_move(record)
+            if value >= probe_beta:
+                return self.cut(beta)
+            if is_exact:
+                lower[index] = upper[index] = value
+                exact[index] = True
+            elif value > low - margin:
+                # Inside the probe window, so this is the first move's exact value
+                lower[index] = max(low, value)
+                first_scores[index] = value
+            lower_sum = rest + weight * lower[index]
+        if lower_sum >= beta_total + margin * total_weight:
+            return self.cut(beta)
+
+        # Remaining bounds after each child: suffix sums of the weighted lower and upper bounds
+        lower_after = [0] * (len(valid_moves) + 1)
+        upper_after = [0] * (len(valid_moves) + 1)
+        for index in range(len(valid_moves) - 1, -1, -1):
+            lower_after[index] = lower_after[index + 1] + weights[index] * lower[index]
+            upper_after[index] = upper_after[index + 1] + weights[index] * upper[index]
+
+        # Star1 search phase, in the same order as the unpruned search
+        expected_value = 0
+        for index, move in enumerate(valid_moves):
+            weight = weights[index]
+            if exact[index]:
+                score = lower[index]
+            else:
+                child_alpha = (alpha_total - expected_value - upper_after[index + 1]) / weight - margin
+                child_beta = (beta_total - expected_value - lower_after[index + 1]) / weight + margin
+                record = board.make_move(move[0], move[1], self.opponent_color)
+                _, score = self.max_node(board, depth - 1, child_alpha, child_beta, first_scores[index])
+                board.unmake_move(record)
+                if score <= child_alpha:
+                    return self.cut(alpha)
+                if score >= child_beta:
+                    return self.cut(beta)
+            expected_value += weight * score
+            if expected_value + upper_after[index + 1] <= alpha_total - margin * total_weight:
+                return self.cut(alpha)
+            if expected_value + lower_after[index + 1] >= beta_total + margin * total_weight:
+                return self.cut(beta)
+
+        return expected_value / total_weight
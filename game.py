@@ -1,4 +1,5 @@
 from board import Board
+from events import ConsoleSink
 from utils import *
 
 class Agent:
@@ -11,6 +12,13 @@ class Agent:
 
     def __init__(self, color='W'):
         self.color = color
+        # Receives everything the agent reports; a Game replaces it with its own sink
+        self.events = ConsoleSink()
+
+    def close(self):
+        # Releases what the agent holds on to between moves, such as worker processes; call it
+        # once the agent's games are over
+        pass
 
     # def getAction(self, state):
     #     """
@@ -20,42 +28,72 @@ class Agent:
 
     #     raiseNotDefined()
 
+def player_name(player):
+    # The player's `name` if it was given one, else its class name
+    return getattr(player, 'name', type(player).__name__)
+
+
 class Game:
-    def __init__(self, player1, player2):
+    def __init__(self, player1, player2, events=None):
         self.board = Board()
         self.players = [player1, player2]
         self.current_player = player1
+        # Plies played so far, passes included
+        self.plies = 0
+        # Where the game and both players report to: events.ConsoleSink (default), NullSink, JSONLSink
+        # or a TeeSink over several of them
+        self.events = events if events is not None else ConsoleSink()
+        for player in self.players:
+            player.events = self.events
 
     def start(self):
         # Main game loop
-        counter = 0
+        self.announce_players()
         while not self.is_game_over():
-            self.board.display()
-            print(f"{self.current_player.color}'s turn")
+            self.events.emit('board', board=self.board)
+            self.events.emit('turn', color=self.current_player.color)
 
             valid_moves = self.board.get_valid_moves(self.current_player.color)
             if valid_moves:
                 row, col = self.current_player.make_move(self.board)
-                self.board.place_disc(row, col, self.current_player.color)
             else:
-                print(f"No valid moves for {self.current_player.color}. Skipping turn.")
+                row, col = None, None
+            self.play_move(row, col)
 
             self.switch_turns()
-            counter+=1
-        self.declare_winner()
-        print(counter)
+        self.declare_winner(self.plies)
+
+    def announce_players(self):
+        # Reports who plays which color and who moves first, before the first ply
+        black, white = sorted(self.players, key=lambda player: player.color)
+        self.events.emit('game_start', black=player_name(black), white=player_name(white), size=self.board.size,
+                         first=self.current_player.color)
+
+    def play_move(self, row, col):
+        # Places the current player's disc and reports the ply; a row of None is a pass
+        self.plies += 1
+        if row is None:
+            self.events.emit('pass', color=self.current_player.color)
+        else:
+            self.board.place_disc(row, col, self.current_player.color)
+            self.events.emit('play', color=self.current_player.color, move=(row, col))
+
     def switch_turns(self):
         self.current_player = self.players[0] if self.current_player == self.players[1] else self.players[1]
 
     def is_game_over(self):
         # Game is over if no valid moves exist for both players or the board is full
-        return self.board.is_full() or not any(self.board.get_valid_moves(player.color) for player in self.players)
+        return self.board.is_full() or not any(self.board.valid_moves_mask(player.color) for player in self.players)
 
-    def declare_winner(self):
+    def winner(self):
+        # 'B', 'W', or None for a tie
         black_score, white_score = self.board.get_score()
         if black_score > white_score:
-            print("Black wins!")
-        elif white_score > black_score:
-            print("White wins!")
-        else:
-            print("It's a tie!")
+            return 'B'
+        if white_score > black_score:
+            return 'W'
+        return None
+
+    def declare_winner(self, plies=None):
+        black_score, white_score = self.board.get_score()
+        self.events.emit('game_over', black=black_score, white=white_score, winner=self.winner(), plies=plies)
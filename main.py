@@ -1,7 +1,11 @@
+import argparse
+import os
 import pygame
 import pickle
+from events import ConsoleSink, TeeSink
 from game import Game
 from player import Minimaxplayer, RandomPlayer, ExpectimaxPlayer, MCTSPlayer
+from records import GameRecordWriter, read_games
 
 # Define constants
 WINDOW_SIZE = 800  # Increased resolution
@@ -11,14 +15,17 @@ BACKGROUND_COLOR = (0, 128, 0)  # Dark green
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
-moves_list = []
-
 def read_test_file(filename):
+    # The expected moves of a test game, with passes as (None, None) like the players return them
+    if os.path.exists(f'{filename}.rec'):
+        record = next(read_games(f'{filename}.rec'))
+        return [(None, None) if move is None else move for move in record.moves]
+    # random42 holds only the minimax player's moves, not a whole game, so it stays a pickle
     with open(f'{filename}.pickle', 'rb') as handle:
         return pickle.load(handle)
 
 class Othello:
-    def __init__(self):
+    def __init__(self, events=None):
         pygame.init()
         self.screen = pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE))
         pygame.display.set_caption("Othello")
@@ -35,7 +42,8 @@ class Othello:
         self.set_players()
 
         # Initialize game
-        self.game = Game(self.player1, self.player2)
+        # Reports the moves to `events` (the console by default), e.g. a records.GameRecordWriter
+        self.game = Game(self.player1, self.player2, events)
 
         # Manage the frame rate
         self.clock = pygame.time.Clock()
@@ -97,6 +105,7 @@ class Othello:
 
     def play_ai_game(self):
         # Main loop for the game
+        self.game.announce_players()
         while not self.game.is_game_over() and self.running:
             # Handle events
             for event in pygame.event.get():
@@ -116,9 +125,7 @@ class Othello:
                 self.move_index += 1
 
             # Update board with the move
-            moves_list.append((row, col))
-            if row is not None and col is not None:
-                self.game.board.place_disc(row, col, current_ai.color)
+            self.game.play_move(row, col)
 
             # Switch turns
             self.game.switch_turns()
@@ -131,6 +138,8 @@ class Othello:
             # Limit the game speed
             self.clock.tick(30)  # Cap the game at 30 FPS
 
+        if self.game.is_game_over():
+            self.game.declare_winner(self.game.plies)
         self.end_game()
 
     def end_game(self):
@@ -153,8 +162,17 @@ class Othello:
         self.running = False
 
 if __name__ == "__main__":
-    game = Othello()
+    parser = argparse.ArgumentParser(description="Watch two agents play Othello.")
+    parser.add_argument('--record', help="also write the game to this game record file")
+    args = parser.parse_args()
+
+    events = TeeSink(ConsoleSink(), GameRecordWriter(args.record)) if args.record else None
+    game = Othello(events)
     while game.running:
         game.play_ai_game()
+    game.player1.close()
+    game.player2.close()
+    if events is not None:
+        events.close()
     
     pygame.quit()
@@ -0,0 +1,275 @@
+"""
+Monte Carlo Tree Search with UCT (Upper Confidence bounds applied to Trees).
+
+Each simulation walks down the tree picking the child with the best UCT score, expands one
+untried move, plays a random game to the end from there and credits the result to every node on
+the path. The tree works on raw (black, white) bitboards and stores moves as single-bit masks,
+with `PASS` (0) standing for a forced pass, so positions are never copied.
+
+`RootParallelSearch` runs independent trees in worker processes and merges their root
+statistics. Leaves can also be scored with many playouts at once through
+`batch_rollout.BatchRollout` (NumPy). Every source of randomness is an explicit generator,
+seeded with `derive_seed`, so results are reproducible and global random state is left alone.
+"""
+import hashlib
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import geometry, moves_mask, flips_mask
+
+# Move value of a forced pass
+PASS = 0
+
+# Weight of the exploration term in the UCT formula
+EXPLORATION = math.sqrt(2)
+
+
+class Node:
+    """
+    A position in the search tree.
+
+    Attributes:
+        move (int): The move (single-bit mask, or `PASS`) that led here from the parent.
+        color (str): The player to move in this position.
+        parent (Node): The parent node, or None for the root.
+        children (list): The expanded child nodes.
+        untried (list): Moves of this position that have no child node yet.
+        visits (int): How many simulations passed through this node.
+        wins (float): The simulations won by the player who made `move` (draws count as half).
+    """
+
+    __slots__ = ('move', 'color', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move, color, parent, untried):
+        self.move = move
+        self.color = color
+        self.parent = parent
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+
+    def uct_child(self, exploration=EXPLORATION):
+        """Returns the child with the highest UCT score."""
+        log_visits = math.log(self.visits)
+        best_child = None
+        best_score = -1.0
+        for child in self.children:
+            score = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best_score = score
+                best_child = child
+        return best_child
+
+    def most_visited_child(self):
+        """Returns the child that was simulated most often, or None if nothing was expanded."""
+        if not self.children:
+            return None
+        return max(self.children, key=lambda child: child.visits)
+
+    def detach(self):
+        """Makes this node the root of its own tree, letting the rest of the old tree be freed."""
+        self.parent = None
+        self.move = None
+        return self
+
+
+def other(color):
+    return 'W' if color == 'B' else 'B'
+
+
+def play(black, white, color, move, geo):
+    """Returns the (black, white) bitboards after `color` plays `move` (or passes)."""
+    if move == PASS:
+        return black, white
+    if color == 'B':
+        flips = flips_mask(move, black, white, geo)
+        return black | move | flips, white & ~flips
+    flips = flips_mask(move, white, black, geo)
+    return black & ~flips, white | move | flips
+
+
+def untried_moves(black, white, color, geo):
+    """
+    Returns the moves available to `color` as a list of single-bit masks, `[PASS]` if the player
+    has to pass, or an empty list if the game is over.
+    """
+    own, opp = (black, white) if color == 'B' else (white, black)
+    mask = moves_mask(own, opp, geo)
+    if not mask:
+        return [PASS] if moves_mask(opp, own, geo) else []
+    moves = []
+    while mask:
+        move = mask & -mask
+        moves.append(move)
+        mask ^= move
+    return moves
+
+
+def random_playout(black, white, color, geo, rng=random):
+    """
+    Plays uniformly random moves, passing when forced, until the game ends.
+
+    Returns:
+        tuple: The final (black, white) disc counts.
+    """
+    passed = False
+    while True:
+        own, opp = (black, white) if color == 'B' else (white, black)
+        mask = moves_mask(own, opp, geo)
+        if mask:
+            passed = False
+            pick = rng.randrange(mask.bit_count())
+            for _ in range(pick):
+                mask &= mask - 1
+            move = mask & -mask
+            flips = flips_mask(move, own, opp, geo)
+            own |= move | flips
+            opp &= ~flips
+            black, white = (own, opp) if color == 'B' else (opp, own)
+        elif passed:
+            return black.bit_count(), white.bit_count()
+        else:
+            passed = True
+        color = other(color)
+
+
+def search(root, black, white, simulations, size=8, rng=random, exploration=EXPLORATION, batch=None,
+           batch_size=64, stats=None):
+    """
+    Runs `simulations` UCT iterations from `root`, whose position is (black, white).
+
+    With a `batch_rollout.BatchRollout` as `batch`, every expanded leaf is scored with
+    `batch_size` playouts at once instead of a single one, and counts as that many visits.
+
+    Args:
+        root (Node): The root of the tree, possibly carrying statistics from earlier searches.
+        black (int): The black bitboard of the root position.
+        white (int): The white bitboard of the root position.
+        simulations (int): The number of iterations to run.
+        size (int): The board size.
+        rng (random.Random): The source of randomness for expansion and playouts.
+        exploration (float): The weight of the exploration term.
+        batch (BatchRollout, optional): Plays the leaf playouts in batches (8x8 boards only).
+        batch_size (int): The number of playouts per leaf when `batch` is given.
+        stats (SearchStats, optional): Counts the tree nodes walked per simulation and the playouts
+            (as leaves), records the deepest walk as the depth and times the playouts.
+    """
+    geo = geometry(size)
+    for _ in range(simulations):
+        node = root
+        b, w = black, white
+        ply = 0
+
+        # Selection: descend through fully expanded nodes
+        while not node.untried and node.children:
+            node = node.uct_child(exploration)
+            b, w = play(b, w, node.parent.color, node.move, geo)
+            ply += 1
+
+        # Expansion: add one untried move
+        if node.untried:
+            move = node.untried.pop(rng.randrange(len(node.untried)))
+            b, w = play(b, w, node.color, move, geo)
+            next_color = other(node.color)
+            child = Node(move, next_color, node, untried_moves(b, w, next_color, geo))
+            node.children.append(child)
+            node = child
+            ply += 1
+
+        # Simulation
+        if stats is not None:
+            start = time.perf_counter()
+        if batch is not None:
+            black_wins, white_wins, draws = batch.playout_stats(b, w, node.color, batch_size)
+            playouts = batch_size
+        else:
+            black_count, white_count = random_playout(b, w, node.color, geo, rng)
+            black_wins = int(black_count > white_count)
+            white_wins = int(white_count > black_count)
+            draws = 1 - black_wins - white_wins
+            playouts = 1
+        if stats is not None:
+            stats.add_time('playout', time.perf_counter() - start)
+            stats.nodes += ply + 1
+            stats.leaves += playouts
+            stats.depth = max(stats.depth, ply)
+
+        # Backpropagation: each node is scored for the player who moved into it
+        while node is not None:
+            node.visits += playouts
+            parent = node.parent
+            if parent is not None:
+                won = black_wins if parent.color == 'B' else white_wins
+                node.wins += won + 0.5 * draws
+            node = parent
+
+
+def derive_seed(base_seed, *parts):
+    """
+    Derives a 64-bit seed from a base seed and any extra identifying values (turn, worker index).
+    The result only depends on the arguments, never on global random state or the process.
+    """
+    digest = hashlib.sha256(repr((base_seed,) + parts).encode('ascii')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def _search_worker(black, white, color, simulations, size, seed, exploration):
+    # Build a private tree in a worker process and report the root children's statistics
+    geo = geometry(size)
+    root = Node(None, color, None, untried_moves(black, white, color, geo))
+    search(root, black, white, simulations, size, random.Random(seed), exploration)
+    return [(child.move, child.visits, child.wins) for child in root.children]
+
+
+class RootParallelSearch:
+    """
+    Root-parallel MCTS: every worker process grows its own tree from the same root with its own
+    seed, and the visit and win counts of the root moves are summed afterwards. The pool is
+    started on first use; call `close` (or use it as a context manager) to shut it down.
+
+    Args:
+        workers (int): The number of worker processes.
+    """
+
+    def __init__(self, workers):
+        if workers < 1:
+            raise ValueError(f"Need at least one worker, got {workers}")
+        self.workers = workers
+        self._executor = None
+
+    def search(self, black, white, color, simulations, seed, size=8, exploration=EXPLORATION):
+        """
+        Spreads `simulations` over the workers, worker i being seeded with `derive_seed(seed, i)`.
+
+        Returns:
+            dict: Maps each root move (bit mask or `PASS`) to its merged (visits, wins).
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        share, extra = divmod(simulations, self.workers)
+        futures = [
+            self._executor.submit(_search_worker, black, white, color, share + (index < extra), size,
+                                  derive_seed(seed, index), exploration)
+            for index in range(self.workers)
+        ]
+        merged = {}
+        for future in futures:
+            for move, visits, wins in future.result():
+                total_visits, total_wins = merged.get(move, (0, 0.0))
+                merged[move] = (total_visits + visits, total_wins + wins)
+        return merged
+
+    def close(self):
+        """Shuts the worker processes down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,29 +1,97 @@
-from board import Board
+import time
+
+from board import geometry
+from transposition import EXACT, LOWER, UPPER
 from utils import raiseNotDefined
 
-def minimax(board, depth, maximizing_player, player_color,use_pruning=False,alpha = -float('inf'),beta = float('inf')):
+# Mixed into transposition table keys so that maximizing and minimizing nodes never share entries
+MAXIMIZING_KEY = 0x9E3779B97F4A7C15
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its deadline has passed."""
+
+def minimax(board, depth, maximizing_player, player_color,use_pruning=False,alpha = -float('inf'),beta = float('inf'),
+            table=None, deadline=None, first_move=None, ordering=None, stats=None, ply=0, evaluate=None):
     """
     Implements the Minimax algorithm to determine the best move for a player in an Othello game.
 
     Args:
-        board (Board): The current game board.
+        board (Board): The current game board. Moves are made and unmade on it in place, so it is
+            back in its original state when the search returns.
         depth (int): The remaining depth to search in the game tree.
         maximizing_player (bool): A boolean indicating whether the current player is the maximizing player.
         player_color (str): The color of the current player ('B' for black, 'W' for white).
+        use_pruning (bool): Whether to cut off branches with alpha-beta pruning.
+        alpha (float): The best score the maximizing player is already assured of.
+        beta (float): The best score the minimizing player is already assured of.
+        table (TranspositionTable, optional): A table of earlier results. Positions stored at the
+            same or a greater depth are answered from it (exact scores, or bounds that narrow the
+            alpha-beta window), and every searched node is stored back into it.
+        deadline (float, optional): A `time.perf_counter()` value. Once it has passed the search raises
+            `SearchTimeout`, leaving `board` in an unspecified state, so search a copy when using it.
+        first_move (tuple, optional): A move to try before all others at this node (not passed down).
+        ordering (MoveOrderer, optional): Sorts the moves of every node and learns from cutoffs.
+            Without it moves are searched in row-major order.
+        stats (SearchStats, optional): Counts nodes, leaves, cutoffs and table hits, and times move
+            generation and evaluation.
+        ply (int): The distance from the root, used to look up killer moves.
+        evaluate (callable, optional): The evaluation function for leaves, with the signature of
+            `evaluate_board` (the default), e.g. `pattern_eval.evaluate_board`.
 
     Returns:
         tuple: A tuple containing the best move (row, col) and its evaluation score (int). 
                If no valid moves are available, returns (None, evaluation score).
     """
+    if stats is not None:
+        stats.nodes += 1
+        if ply == 0:
+            stats.depth = max(stats.depth, depth)
+
+    if evaluate is None:
+        evaluate = evaluate_board
+
     if depth == 0 :
-        return None, evaluate_board(board, player_color)
-    
-    if (not board.get_valid_moves('B') and not board.get_valid_moves('W')):
-        return None, evaluate_board(board, player_color)
+        return None, evaluate(board, player_color) if stats is None else stats.leaf(evaluate, board, player_color)
     
-    valid_moves = board.get_valid_moves(player_color)
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+
+    opponent_color = 'W' if player_color == 'B' else 'B'
+    mover_color = player_color if maximizing_player else opponent_color
+    if stats is None:
+        valid_moves = search_moves(board, mover_color)
+    else:
+        valid_moves = stats.timed('movegen', search_moves, board, mover_color)
     if not valid_moves:
-        return None, evaluate_board(board, player_color)
+        return None, evaluate(board, player_color) if stats is None else stats.leaf(evaluate, board, player_color)
+
+    tt_move = None
+    if table is not None:
+        key = board.hash_key(mover_color)
+        if maximizing_player:
+            key ^= MAXIMIZING_KEY
+        entry = table.probe(key)
+        if stats is not None:
+            stats.tt_probes += 1
+            stats.tt_hits += entry is not None
+        if entry is not None:
+            tt_move = entry.move
+        if entry is not None and entry.depth >= depth:
+            if entry.flag == EXACT:
+                return entry.move, entry.score
+            if entry.flag == LOWER:
+                alpha = max(alpha, entry.score)
+            else:
+                beta = min(beta, entry.score)
+            if alpha >= beta:
+                return entry.move, entry.score
+        window = (alpha, beta)
+
+    if ordering is not None:
+        valid_moves = ordering.order(valid_moves, ply, mover_color, first_move or tt_move)
+    elif first_move in valid_moves:
+        valid_moves.remove(first_move)
+        valid_moves.insert(0, first_move)
     
     best_move = None
     if maximizing_player:
@@ -32,9 +100,10 @@ def minimax(board, depth, maximizing_player, player_color,use_pruning=False,alph
 
         for move in valid_moves:
 
-            new_board = copy_board(board)
-            new_board.place_disc(move[0], move[1], player_color)
-            _, score = minimax(new_board, depth-1, False, player_color, use_pruning, alpha, beta)
+            record = board.make_move(move[0], move[1], player_color)
+            _, score = minimax(board, depth-1, False, player_color, use_pruning, alpha, beta, table, deadline,
+                               ordering=ordering, stats=stats, ply=ply+1, evaluate=evaluate)
+            board.unmake_move(record)
             
             if score > maxScore:
                 maxScore = score
@@ -46,20 +115,23 @@ def minimax(board, depth, maximizing_player, player_color,use_pruning=False,alph
 
                 if beta <= alpha:
 
+                    record_cutoff(move, ply, depth, mover_color, ordering, stats)
                     break
 
+        if table is not None:
+            store_result(table, key, depth, maxScore, window, best_move)
         return best_move, maxScore
     
     else:
 
         min_eval = float('inf')
-        opponent_color = 'W' if player_color == 'B' else 'B'
         
         for move in valid_moves:
 
-            new_board = copy_board(board)
-            new_board.place_disc(move[0], move[1], opponent_color)
-            _, score = minimax(new_board, depth-1, True, player_color, use_pruning, alpha, beta)
+            record = board.make_move(move[0], move[1], opponent_color)
+            _, score = minimax(board, depth-1, True, player_color, use_pruning, alpha, beta, table, deadline,
+                               ordering=ordering, stats=stats, ply=ply+1, evaluate=evaluate)
+            board.unmake_move(record)
             
             if score < min_eval:
 
@@ -72,19 +144,222 @@ def minimax(board, depth, maximizing_player, player_color,use_pruning=False,alph
 
                 if beta <= alpha:
 
+                    record_cutoff(move, ply, depth, mover_color, ordering, stats)
                     break
                 
+        if table is not None:
+            store_result(table, key, depth, min_eval, window, best_move)
         return best_move, min_eval
 
 
     
     raiseNotDefined()
 
+def pvs(board, depth, player_color, alpha=-float('inf'), beta=float('inf'), table=None, deadline=None,
+        first_move=None, ordering=None, stats=None, ply=0, evaluate=None):
+    """
+    Principal Variation Search (NegaScout): alpha-beta in negamax form where every move after the
+    first is searched with a null window (alpha, alpha + 1) to prove it is no better, and only
+    re-searched with the full window if that proof fails.
+
+    Scores are always from the point of view of the player to move, so the maximizing and
+    minimizing branches of `minimax` collapse into one. Leaves, depth limit and positions where
+    the mover has no moves are treated exactly as in `minimax`, so at equal depth and with the
+    same move order `pvs` returns the same best move and score as `minimax` with
+    `use_pruning=True`. The null window relies on the evaluation returning integers, and the
+    negamax form on it being symmetric: evaluate(board, 'B') == -evaluate(board, 'W').
+
+    Args:
+        board (Board): The current game board, searched in place like in `minimax`.
+        depth (int): The remaining depth to search in the game tree.
+        player_color (str): The color of the player to move ('B' for black, 'W' for white).
+        alpha (float): The score the player to move is already assured of.
+        beta (float): The score above which the opponent will avoid this position.
+        table, deadline, first_move, ordering, stats, ply, evaluate: As in `minimax`. Entries are keyed like
+            the maximizing nodes of `minimax`, so both searches can share a table.
+
+    Returns:
+        tuple: The best move (row, col) or None, and its score for `player_color`.
+    """
+    if stats is not None:
+        stats.nodes += 1
+        if ply == 0:
+            stats.depth = max(stats.depth, depth)
+
+    if evaluate is None:
+        evaluate = evaluate_board
+
+    if depth == 0:
+        return None, evaluate(board, player_color) if stats is None else stats.leaf(evaluate, board, player_color)
+
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+
+    if stats is None:
+        valid_moves = search_moves(board, player_color)
+    else:
+        valid_moves = stats.timed('movegen', search_moves, board, player_color)
+    if not valid_moves:
+        return None, evaluate(board, player_color) if stats is None else stats.leaf(evaluate, board, player_color)
+
+    tt_move = None
+    if table is not None:
+        key = board.hash_key(player_color) ^ MAXIMIZING_KEY
+        entry = table.probe(key)
+        if stats is not None:
+            stats.tt_probes += 1
+            stats.tt_hits += entry is not None
+        if entry is not None:
+            tt_move = entry.move
+        if entry is not None and entry.depth >= depth:
+            if entry.flag == EXACT:
+                return entry.move, entry.score
+            if entry.flag == LOWER:
+                alpha = max(alpha, entry.score)
+            else:
+                beta = min(beta, entry.score)
+            if alpha >= beta:
+                return entry.move, entry.score
+        window = (alpha, beta)
+
+    if ordering is not None:
+        valid_moves = ordering.order(valid_moves, ply, player_color, first_move or tt_move)
+    elif first_move in valid_moves:
+        valid_moves.remove(first_move)
+        valid_moves.insert(0, first_move)
+
+    opponent_color = 'W' if player_color == 'B' else 'B'
+    best_move = None
+    best_score = -float('inf')
+
+    for move in valid_moves:
+        record = board.make_move(move[0], move[1], player_color)
+        if best_move is None:
+            _, score = pvs(board, depth-1, opponent_color, -beta, -alpha, table, deadline,
+                           ordering=ordering, stats=stats, ply=ply+1, evaluate=evaluate)
+            score = -score
+        else:
+            # Try to prove the move is no better than alpha with a null window
+            _, score = pvs(board, depth-1, opponent_color, -alpha-1, -alpha, table, deadline,
+                           ordering=ordering, stats=stats, ply=ply+1, evaluate=evaluate)
+            score = -score
+            if alpha < score < beta:
+                _, score = pvs(board, depth-1, opponent_color, -beta, -alpha, table, deadline,
+                               ordering=ordering, stats=stats, ply=ply+1, evaluate=evaluate)
+                score = -score
+        board.unmake_move(record)
+
+        if score > best_score:
+            best_score = score
+            best_move = move
+
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            record_cutoff(move, ply, depth, player_color, ordering, stats)
+            break
+
+    if table is not None:
+        store_result(table, key, depth, best_score, window, best_move)
+    return best_move, best_score
+
+def search_moves(board, color):
+    """
+    Returns the legal moves of `color`, or an empty list if the game is over (neither side can
+    move). Both cases are leaves for the searches.
+    """
+    if not board.valid_moves_mask('B') and not board.valid_moves_mask('W'):
+        return []
+    return board.get_valid_moves(color)
+
+def record_cutoff(move, ply, depth, color, ordering, stats):
+    """
+    Books a beta cutoff caused by `move` with the move orderer and the statistics, if present.
+    """
+    if ordering is not None:
+        ordering.record_cutoff(move, ply, depth, color)
+    if stats is not None:
+        stats.cutoffs += 1
+
+def iterative_deepening(board, player_color, time_ms, max_depth=None, use_pruning=True, table=None,
+                        ordering=None, stats=None, use_pvs=False, evaluate=None):
+    """
+    Runs `minimax` at increasing depths until the time budget runs out, and returns the result of
+    the deepest search that finished. The best move of each iteration is searched first in the
+    next one, which makes alpha-beta cut off far more of the tree.
+
+    Args:
+        board (Board): The current game board. It is not modified; each iteration searches a copy.
+        player_color (str): The color of the player to move ('B' for black, 'W' for white).
+        time_ms (float): The wall-clock budget for the whole decision, in milliseconds. Depth 1 is
+            always completed, even if it takes longer than the budget.
+        max_depth (int, optional): The deepest search to attempt. Defaults to the number of empty
+            squares, i.e. searching until the end of the game or the budget.
+        use_pruning (bool): Whether to use alpha-beta pruning.
+        table (TranspositionTable, optional): Shared by all iterations, see `minimax`.
+        ordering (MoveOrderer, optional): Shared by all iterations, see `minimax`.
+        stats (SearchStats, optional): Accumulates the counters of all iterations; its `depth` ends up
+            as the deepest iteration started.
+        use_pvs (bool): Search each iteration with `pvs` instead of `minimax`.
+        evaluate (callable, optional): The evaluation function, see `minimax`.
+
+    Returns:
+        tuple: The best move (row, col) or None, its score, and the depth that produced them.
+    """
+    start = time.perf_counter()
+    deadline = start + time_ms / 1000.0
+    if max_depth is None:
+        black, white = board.get_score()
+        max_depth = max(1, board.size * board.size - black - white)
+
+    def search(depth, deadline=None, first_move=None):
+        if use_pvs:
+            return pvs(board.copy(), depth, player_color, table=table, deadline=deadline,
+                       first_move=first_move, ordering=ordering, stats=stats, evaluate=evaluate)
+        return minimax(board.copy(), depth, True, player_color, use_pruning, table=table, deadline=deadline,
+                       first_move=first_move, ordering=ordering, stats=stats, evaluate=evaluate)
+
+    best_move, best_score = search(1)
+    completed = 1
+
+    for depth in range(2, max_depth + 1):
+        try:
+            move, score = search(depth, deadline, best_move)
+        except SearchTimeout:
+            break
+        best_move, best_score, completed = move, score, depth
+
+    return best_move, best_score, completed
+
+def store_result(table, key, depth, score, window, move):
+    """
+    Stores a node's result in the transposition table, classifying it against the alpha-beta
+    window the node was searched with.
+
+    Args:
+        table (TranspositionTable): The table to store into.
+        key (int): The node's hash key.
+        depth (int): The depth the node was searched to.
+        score (int): The score the search returned.
+        window (tuple): The (alpha, beta) window the node was searched with.
+        move (tuple): The best move found, or None.
+    """
+    alpha, beta = window
+    if score <= alpha:
+        flag = UPPER
+    elif score >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table.store(key, depth, score, flag, move)
+
 def evaluate_board(board, player_color):
     """
     Evaluates the current board state for a given player by considering the score, corner occupation,
     edge control, and mobility.
 
+    Every term is a population count of the board's bitboards against a fixed mask, so nothing is
+    rescanned square by square and mobility needs no list of moves.
+
     Args:
         board (Board): The current game board.
         player_color (str): The color of the player to evaluate the score for ('B' for black, 'W' for white).
@@ -92,45 +367,22 @@ def evaluate_board(board, player_color):
     Returns:
         int: An evaluation score where a positive value favors the player, and a negative value favors the opponent.
     """
-    # Get the basic score
-    B_score, W_score = board.get_score()
-    score = W_score - B_score if player_color == 'W' else B_score - W_score
+    own, opp = board.discs(player_color)
+    geo = geometry(board.size)
+
+    # Basic score: disc difference
+    score = own.bit_count() - opp.bit_count()
 
-    # Define opponent color
-    opponent_color = 'W' if player_color == 'B' else 'B'
-    
     # Corner weights
-    corners = [(0, 0), (0, board.size - 1), (board.size - 1, 0), (board.size - 1, board.size - 1)]
-    corner_score = 0
-    for r, c in corners:
-        if board.board[r][c] == player_color:
-            corner_score += 25
-        elif board.board[r][c] == opponent_color:
-            corner_score -= 25
+    corner_score = 25 * ((own & geo.corners).bit_count() - (opp & geo.corners).bit_count())
 
     # Edge control weights
-    edge_score = 0
-    for i in range(1, board.size - 1):
-        if board.board[0][i] == player_color:
-            edge_score += 5
-        elif board.board[0][i] == opponent_color:
-            edge_score -= 5
-        if board.board[board.size - 1][i] == player_color:
-            edge_score += 5
-        elif board.board[board.size - 1][i] == opponent_color:
-            edge_score -= 5
-        if board.board[i][0] == player_color:
-            edge_score += 5
-        elif board.board[i][0] == opponent_color:
-            edge_score -= 5
-        if board.board[i][board.size - 1] == player_color:
-            edge_score += 5
-        elif board.board[i][board.size - 1] == opponent_color:
-            edge_score -= 5
+    edge_score = 5 * ((own & geo.edges).bit_count() - (opp & geo.edges).bit_count())
 
     # Mobility: the number of valid moves
-    player_moves = len(board.get_valid_moves(player_color))
-    opponent_moves = len(board.get_valid_moves(opponent_color))
+    opponent_color = 'W' if player_color == 'B' else 'B'
+    player_moves = board.valid_moves_mask(player_color).bit_count()
+    opponent_moves = board.valid_moves_mask(opponent_color).bit_count()
     mobility_score = (player_moves - opponent_moves) * 2
 
     # Combine all scores
@@ -138,10 +390,33 @@ def evaluate_board(board, player_color):
     return total_score
 
 
+def evaluate_board_bounds(size=8):
+    """
+    Returns the (lowest, highest) value `evaluate_board` can take on a board of the given size.
+
+    A square adds at most its disc weight (1, plus 25 on a corner or 5 on an edge) when the player
+    holds it, or 2 when it is empty and the player may move there; opponent terms only subtract.
+    The evaluation is antisymmetric, so the lowest value is the negated highest.
+
+    Args:
+        size (int): The board size.
+
+    Returns:
+        tuple: The lowest and highest possible evaluation.
+    """
+    geo = geometry(size)
+    corners = geo.corners.bit_count()
+    edges = geo.edges.bit_count()
+    interior = geo.squares - corners - edges
+    high = corners * 26 + edges * 6 + interior * 2
+    return -high, high
+
+
 
 def copy_board(board):
     """
     Creates a deep copy of the current board to simulate future moves without altering the original.
+    The search itself no longer copies; it uses `Board.make_move` and `Board.unmake_move`.
 
     Args:
         board (Board): The current game board to be copied.
@@ -149,6 +424,4 @@ def copy_board(board):
     Returns:
         Board: A new Board object with the same state as the original.
     """
-    new_board = Board(board.size)
-    new_board.board = [row[:] for row in board.board]
-    return new_board
\ No newline at end of file
+    return board.copy()
\ No newline at end of file
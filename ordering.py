@@ -0,0 +1,90 @@
+def square_priority(size=8):
+    """
+    Returns a static priority for every square of a size x size board, higher meaning "try first".
+
+    Corners come first (they can never be flipped back), then the remaining edge squares, then
+    the interior. The C squares (edge squares next to a corner) and X squares (diagonally next
+    to a corner) come last, because playing them usually hands the corner to the opponent.
+
+    Args:
+        size (int): The board size.
+
+    Returns:
+        dict: A mapping from (row, col) to its priority.
+    """
+    last = size - 1
+    corners = {(0, 0), (0, last), (last, 0), (last, last)}
+    x_squares = {(1, 1), (1, last - 1), (last - 1, 1), (last - 1, last - 1)}
+    c_squares = {(0, 1), (1, 0), (0, last - 1), (1, last), (last - 1, 0), (last, 1), (last, last - 1), (last - 1, last)}
+
+    priority = {}
+    for row in range(size):
+        for col in range(size):
+            square = (row, col)
+            if square in corners:
+                priority[square] = 4
+            elif square in x_squares:
+                priority[square] = 0
+            elif square in c_squares:
+                priority[square] = 1
+            elif row in (0, last) or col in (0, last):
+                priority[square] = 3
+            else:
+                priority[square] = 2
+    return priority
+
+
+class MoveOrderer:
+    """
+    Orders moves so that alpha-beta searches the likely best move first.
+
+    Moves are sorted by, in decreasing importance:
+
+    1. the hint move (the transposition table move, or the previous iteration's best move),
+    2. the killer moves of the current ply, i.e. quiet moves that recently caused a cutoff in a
+       sibling node,
+    3. the static square priority from `square_priority`,
+    4. the history heuristic: how often, weighted by depth, the move caused a cutoff anywhere.
+
+    Args:
+        size (int): The board size.
+        killers_per_ply (int): How many killer moves to remember for each ply.
+    """
+
+    def __init__(self, size=8, killers_per_ply=2):
+        self.priority = square_priority(size)
+        self.killers_per_ply = killers_per_ply
+        self.killers = []
+        self.history = {'B': {}, 'W': {}}
+
+    def order(self, moves, ply, color, hint=None):
+        """Returns `moves` sorted best first for `color` at the given ply."""
+        killers = self.killers[ply] if ply < len(self.killers) else []
+        history = self.history[color]
+        priority = self.priority
+
+        def sort_key(move):
+            killer_rank = len(killers) - killers.index(move) if move in killers else 0
+            return (move == hint, killer_rank, priority[move], history.get(move, 0))
+
+        return sorted(moves, key=sort_key, reverse=True)
+
+    def record_cutoff(self, move, ply, depth, color):
+        """Credits `move` for causing a beta cutoff at `ply` with `depth` plies left to search."""
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move in killers:
+            killers.remove(move)
+        killers.insert(0, move)
+        del killers[self.killers_per_ply:]
+
+        history = self.history[color]
+        history[move] = history.get(move, 0) + depth * depth
+
+    def age(self):
+        """Halves the history scores and forgets the killers, e.g. before a new root search."""
+        self.killers = []
+        for history in self.history.values():
+            for move in history:
+                history[move] //= 2
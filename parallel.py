@@ -0,0 +1,162 @@
+"""
+Root-parallel minimax over a pool of worker processes.
+
+The GIL keeps threads from speeding up the pure-Python search, so the root moves are handed to
+separate processes instead. The first root move is searched on its own ("eldest brother first",
+as in Young Brothers Wait) to get a good alpha bound, then all remaining moves are searched in
+parallel. Workers publish every better root score through a shared double, and each new task
+starts its search with the best bound published so far.
+
+The result is the same move and score as the serial `minimax` with the same settings: each root
+move is searched with a window just below the shared bound, so any move that could tie or beat
+the best score is searched exactly, and ties go to the earliest move in row-major order.
+
+Usage:
+    python parallel.py [--depth 5] [--workers 4] [--positions 4]
+"""
+import argparse
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+from minimax import minimax
+
+# The best root score found so far, shared with the workers through the pool initializer
+_shared_alpha = None
+
+
+def _init_worker(shared_alpha):
+    global _shared_alpha
+    _shared_alpha = shared_alpha
+
+
+def _search_root_move(black, white, size, move, depth, player_color, use_pruning, evaluate):
+    # Search one root move in a worker and publish its score if it raised the bound
+    board = Board.from_bitboards(black, white, size)
+    board.make_move(move[0], move[1], player_color)
+
+    alpha = -float('inf')
+    if use_pruning:
+        # Just below the bound, so that a move equal to the best so far is still scored exactly
+        alpha = math.nextafter(_shared_alpha.value, -math.inf)
+
+    _, score = minimax(board, depth - 1, False, player_color, use_pruning, alpha, float('inf'),
+                       evaluate=evaluate)
+
+    if use_pruning:
+        with _shared_alpha.get_lock():
+            if score > _shared_alpha.value:
+                _shared_alpha.value = score
+    return score
+
+
+class ParallelSearcher:
+    """
+    A pool of worker processes that searches the root moves of `minimax` in parallel.
+
+    The pool is started on first use and kept for later searches; call `close` (or use the
+    searcher as a context manager) to shut it down.
+
+    Args:
+        workers (int): The number of worker processes.
+    """
+
+    def __init__(self, workers):
+        if workers < 1:
+            raise ValueError(f"Need at least one worker, got {workers}")
+        self.workers = workers
+        self._executor = None
+        self._shared_alpha = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._shared_alpha = multiprocessing.Value('d', -math.inf)
+            self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                 initargs=(self._shared_alpha,))
+        return self._executor
+
+    def search(self, board, depth, player_color, use_pruning=True, evaluate=None):
+        """
+        Returns the best move and score for `player_color`, as `minimax(board, depth, True,
+        player_color, use_pruning, evaluate=evaluate)` would. `evaluate` must be picklable,
+        e.g. a module-level function.
+        """
+        valid_moves = board.get_valid_moves(player_color)
+        if depth <= 1 or len(valid_moves) < 2:
+            return minimax(board, depth, True, player_color, use_pruning, evaluate=evaluate)
+
+        pool = self._pool()
+        with self._shared_alpha.get_lock():
+            self._shared_alpha.value = -math.inf
+
+        def submit(move):
+            return pool.submit(_search_root_move, board.black, board.white, board.size, move, depth,
+                               player_color, use_pruning, evaluate)
+
+        first = submit(valid_moves[0])
+        if use_pruning:
+            first.result()
+        futures = [first] + [submit(move) for move in valid_moves[1:]]
+        scores = [future.result() for future in futures]
+
+        best_score = max(scores)
+        return valid_moves[scores.index(best_score)], best_score
+
+    def close(self):
+        """Shuts the worker processes down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def benchmark(depth=5, workers=4, positions=4, use_pruning=True):
+    """
+    Times serial against parallel search on a few early-game positions, checking that both pick the
+    same moves, and prints the speedup.
+    """
+    boards = []
+    board = Board()
+    color = 'B'
+    while len(boards) < positions:
+        moves = board.get_valid_moves(color)
+        if not moves:
+            break
+        boards.append((board.copy(), color))
+        board.place_disc(*moves[len(boards) % len(moves)], color)
+        color = 'W' if color == 'B' else 'B'
+
+    start = time.perf_counter()
+    serial = [minimax(b, depth, True, c, use_pruning) for b, c in boards]
+    serial_time = time.perf_counter() - start
+
+    with ParallelSearcher(workers) as searcher:
+        # Start the pool before timing so process start-up is not counted
+        searcher.search(Board(), 2, 'B', use_pruning)
+        start = time.perf_counter()
+        parallel = [searcher.search(b, depth, c, use_pruning) for b, c in boards]
+        parallel_time = time.perf_counter() - start
+
+    if serial != parallel:
+        raise AssertionError(f"Parallel search disagrees with serial search: {parallel} != {serial}")
+    print(f"depth {depth}, {len(boards)} positions, pruning {'on' if use_pruning else 'off'}")
+    print(f"serial:   {serial_time:.2f}s")
+    print(f"parallel: {parallel_time:.2f}s with {workers} workers")
+    print(f"speedup:  {serial_time / parallel_time:.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark root-parallel minimax against the serial search.")
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--positions', type=int, default=4)
+    parser.add_argument('--no-pruning', action='store_true')
+    args = parser.parse_args()
+    benchmark(args.depth, args.workers, args.positions, not args.no_pruning)
@@ -0,0 +1,362 @@
+"""
+Pattern-based board evaluation in the style of classic Othello engines.
+
+The board is scored as the sum of table lookups, one per pattern instance. A pattern is a fixed
+set of squares (an edge plus its two X squares, a 3x3 corner block, a diagonal), and each
+instance is one of its symmetric placements on the board. The contents of an instance's squares
+are read as a base-3 number (empty = 0, black = 1, white = 2) which indexes that pattern's
+weight table, so all symmetric instances share one table.
+
+The indices are computed straight from the bitboards: rows are bytes of the bitboard, and columns
+and diagonals are gathered into a byte with a single multiplication, after which a 256-entry
+table turns the byte into its base-3 value.
+
+Weights are read from a compact binary file (see `save_weights` for the format). The file that
+ships with the game is built by `build_default_weights` from a positional square table; weights
+trained on game records can be dropped in with `save_weights`.
+
+Usage:
+    python pattern_eval.py build [path]
+"""
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+SIZE = 8
+DEFAULT_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pattern_weights.bin')
+
+MAGIC = b'OPAT'
+VERSION = 1
+
+# Gathers column 0 of a bitboard into the top byte, row k landing on bit 56 + k
+_COLUMN_MAGIC = 0x0102040810204080
+_COLUMN_MASK = 0x0101010101010101
+# Gathers any set of squares on distinct columns into the top byte, column c landing on bit 56 + c
+_DIAGONAL_MAGIC = 0x0101010101010101
+
+# _TERNARY[bits] reads the bits of a byte as base-3 digits: bit k set adds 3**k
+_TERNARY = [sum(3 ** k for k in range(8) if bits >> k & 1) for bits in range(256)]
+_TERNARY_WHITE = [2 * value for value in _TERNARY]
+# The same for three bits read in reverse order, for the corners on the right-hand side
+_TERNARY_REVERSED3 = [sum(3 ** (2 - k) for k in range(3) if bits >> k & 1) for bits in range(8)]
+_TERNARY_REVERSED3_WHITE = [2 * value for value in _TERNARY_REVERSED3]
+
+# Pattern names and the number of squares in each
+PATTERNS = [
+    ('edge2x', 10),
+    ('corner3x3', 9),
+    ('diag8', 8),
+    ('diag7', 7),
+    ('diag6', 6),
+    ('diag5', 5),
+    ('diag4', 4),
+]
+
+# Positional value of each square for black, used to seed the default weights
+SQUARE_VALUES = [
+    [100, -20, 10, 5, 5, 10, -20, 100],
+    [-20, -50, -2, -2, -2, -2, -50, -20],
+    [10, -2, 1, 1, 1, 1, -2, 10],
+    [5, -2, 1, 0, 0, 1, -2, 5],
+    [5, -2, 1, 0, 0, 1, -2, 5],
+    [10, -2, 1, 1, 1, 1, -2, 10],
+    [-20, -50, -2, -2, -2, -2, -50, -20],
+    [100, -20, 10, 5, 5, 10, -20, 100],
+]
+
+
+def _edge_instances():
+    # (line kind, line number, first X square, second X square); each line is read in increasing order
+    return [
+        ('row', 0, (1, 1), (1, 6)),
+        ('row', 7, (6, 1), (6, 6)),
+        ('col', 0, (1, 1), (6, 1)),
+        ('col', 7, (1, 6), (6, 6)),
+    ]
+
+
+def _corner_instances():
+    # (rows from the corner inwards, whether columns are read right to left)
+    return [
+        ((0, 1, 2), False),
+        ((0, 1, 2), True),
+        ((7, 6, 5), False),
+        ((7, 6, 5), True),
+    ]
+
+
+def _diagonal_instances(length):
+    # (mask, lowest column) of every diagonal and anti-diagonal with `length` squares
+    offset = SIZE - length
+    instances = []
+    for squares in (
+        [(r, r + offset) for r in range(length)],
+        [(r + offset, r) for r in range(length)],
+        [(r, SIZE - 1 - offset - r) for r in range(length)],
+        [(r + offset, SIZE - 1 - r) for r in range(length)],
+    ):
+        mask = 0
+        for row, col in squares:
+            mask |= 1 << (row * SIZE + col)
+        instance = (mask, min(col for _, col in squares))
+        if instance not in instances:
+            instances.append(instance)
+    return instances
+
+
+def _instance_squares():
+    """Returns, per pattern, the ordered squares of every instance (digit k is the k-th square)."""
+    squares = {}
+    squares['edge2x'] = []
+    for kind, line, x1, x2 in _edge_instances():
+        if kind == 'row':
+            cells = [(line, col) for col in range(SIZE)]
+        else:
+            cells = [(row, line) for row in range(SIZE)]
+        squares['edge2x'].append(cells + [x1, x2])
+    squares['corner3x3'] = []
+    for rows, reversed_cols in _corner_instances():
+        cols = (7, 6, 5) if reversed_cols else (0, 1, 2)
+        squares['corner3x3'].append([(row, col) for row in rows for col in cols])
+    for length in range(8, 3, -1):
+        squares[f'diag{length}'] = []
+        for mask, low in _diagonal_instances(length):
+            cells = sorted(((index // SIZE, index % SIZE) for index in range(64) if mask >> index & 1),
+                           key=lambda cell: cell[1])
+            squares[f'diag{length}'].append(cells)
+    return squares
+
+
+class PatternWeights:
+    """
+    The weight tables of every pattern, indexed by base-3 configuration, scored for black.
+
+    Attributes:
+        tables (dict): Maps a pattern name to an `array('h')` of 3 ** length weights.
+    """
+
+    def __init__(self, tables):
+        for name, length in PATTERNS:
+            if name not in tables:
+                raise ValueError(f"Missing weight table for pattern {name!r}")
+            if len(tables[name]) != 3 ** length:
+                raise ValueError(f"Weight table {name!r} has {len(tables[name])} entries, expected {3 ** length}")
+        self.tables = tables
+
+    def bounds(self):
+        """Returns the (lowest, highest) score the weights can produce for any position."""
+        instances = {name: len(cells) for name, cells in _instance_squares().items()}
+        low = sum(min(self.tables[name]) * instances[name] for name, _ in PATTERNS)
+        high = sum(max(self.tables[name]) * instances[name] for name, _ in PATTERNS)
+        return low, high
+
+
+def save_weights(weights, path=DEFAULT_WEIGHTS_PATH):
+    """
+    Writes weight tables to a binary file.
+
+    The file starts with a header `<4sHH` (magic b'OPAT', format version, number of tables),
+    followed for every table by its name (one length byte, then ASCII) and its entry count
+    (`<I`). The rest of the file is the zlib-compressed concatenation of all tables as
+    little-endian int16, in header order.
+    """
+    names = [name for name, _ in PATTERNS]
+    header = [struct.pack('<4sHH', MAGIC, VERSION, len(names))]
+    payload = array('h')
+    for name in names:
+        table = weights.tables[name]
+        encoded = name.encode('ascii')
+        header.append(struct.pack('<B', len(encoded)) + encoded + struct.pack('<I', len(table)))
+        payload.extend(table)
+    if sys.byteorder != 'little':
+        payload.byteswap()
+    with open(path, 'wb') as handle:
+        handle.write(b''.join(header))
+        handle.write(zlib.compress(payload.tobytes(), 9))
+
+
+def load_weights(path=DEFAULT_WEIGHTS_PATH):
+    """Reads weight tables written by `save_weights` and returns a `PatternWeights`."""
+    with open(path, 'rb') as handle:
+        data = handle.read()
+
+    magic, version, count = struct.unpack_from('<4sHH', data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a pattern weight file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported pattern weight file version {version}")
+
+    offset = struct.calcsize('<4sHH')
+    layout = []
+    for _ in range(count):
+        (name_length,) = struct.unpack_from('<B', data, offset)
+        offset += 1
+        name = data[offset:offset + name_length].decode('ascii')
+        offset += name_length
+        (entries,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        layout.append((name, entries))
+
+    payload = array('h')
+    payload.frombytes(zlib.decompress(data[offset:]))
+    if sys.byteorder != 'little':
+        payload.byteswap()
+
+    tables = {}
+    start = 0
+    for name, entries in layout:
+        tables[name] = payload[start:start + entries]
+        start += entries
+    return PatternWeights(tables)
+
+
+def build_default_weights():
+    """
+    Builds untrained starting weights from `SQUARE_VALUES`.
+
+    Every square's value is shared out evenly between the pattern instances covering it, so that
+    summed over the board the patterns reproduce the square table. On top of that, the edge
+    pattern knows that an X square is only a liability while its corner is still empty.
+    """
+    instance_squares = _instance_squares()
+    coverage = {}
+    for cells_list in instance_squares.values():
+        for cells in cells_list:
+            for cell in cells:
+                coverage[cell] = coverage.get(cell, 0) + 1
+
+    tables = {}
+    for name, length in PATTERNS:
+        # All instances of a pattern are symmetric, so the first one stands for all of them
+        cells = instance_squares[name][0]
+        values = [SQUARE_VALUES[row][col] / coverage[(row, col)] for row, col in cells]
+        table = array('h', [0]) * (3 ** length)
+        for index in range(3 ** length):
+            digits = []
+            rest = index
+            for _ in range(length):
+                digits.append(rest % 3)
+                rest //= 3
+            score = 0.0
+            for digit, value in zip(digits, values):
+                if digit == 1:
+                    score += value
+                elif digit == 2:
+                    score -= value
+            if name == 'edge2x':
+                # Digits 8 and 9 are the X squares next to the corners at digits 0 and 7
+                for x_digit, corner_digit in ((8, 0), (9, 7)):
+                    if digits[corner_digit] != 0 and digits[x_digit] != 0:
+                        sign = 1 if digits[x_digit] == 1 else -1
+                        score -= sign * values[x_digit]
+            table[index] = round(score * 4)
+        tables[name] = table
+    return PatternWeights(tables)
+
+
+class PatternEvaluator:
+    """
+    Scores positions with a set of `PatternWeights`.
+
+    Instances are callable with the same signature as `minimax.evaluate_board`, so they can be
+    passed wherever a search accepts an evaluation function. Only 8x8 boards are supported.
+    """
+
+    def __init__(self, weights):
+        self.weights = weights
+        tables = weights.tables
+        self.edge = tables['edge2x']
+        self.corner = tables['corner3x3']
+
+        self.edges = []
+        for kind, line, x1, x2 in _edge_instances():
+            x1_bit = x1[0] * SIZE + x1[1]
+            x2_bit = x2[0] * SIZE + x2[1]
+            self.edges.append((kind == 'row', line * SIZE if kind == 'row' else line, x1_bit, x2_bit))
+
+        self.corners = []
+        for rows, reversed_cols in _corner_instances():
+            shifts = tuple(row * SIZE + (5 if reversed_cols else 0) for row in rows)
+            self.corners.append((shifts, reversed_cols))
+
+        self.diagonals = []
+        for length in range(8, 3, -1):
+            table = tables[f'diag{length}']
+            for mask, low in _diagonal_instances(length):
+                self.diagonals.append((mask, 56 + low, table))
+
+    def score(self, black, white):
+        """Returns the evaluation of the position for black."""
+        ternary = _TERNARY
+        ternary_white = _TERNARY_WHITE
+        total = 0
+
+        edge = self.edge
+        for is_row, offset, x1, x2 in self.edges:
+            if is_row:
+                index = ternary[(black >> offset) & 0xFF] + ternary_white[(white >> offset) & 0xFF]
+            else:
+                index = (ternary[((((black >> offset) & _COLUMN_MASK) * _COLUMN_MAGIC) >> 56) & 0xFF]
+                         + ternary_white[((((white >> offset) & _COLUMN_MASK) * _COLUMN_MAGIC) >> 56) & 0xFF])
+            index += 6561 * ((black >> x1 & 1) + 2 * (white >> x1 & 1))
+            index += 19683 * ((black >> x2 & 1) + 2 * (white >> x2 & 1))
+            total += edge[index]
+
+        corner = self.corner
+        for (s0, s1, s2), reversed_cols in self.corners:
+            if reversed_cols:
+                digits, digits_white = _TERNARY_REVERSED3, _TERNARY_REVERSED3_WHITE
+            else:
+                digits, digits_white = ternary, ternary_white
+            index = (digits[(black >> s0) & 7] + digits_white[(white >> s0) & 7]
+                     + 27 * (digits[(black >> s1) & 7] + digits_white[(white >> s1) & 7])
+                     + 729 * (digits[(black >> s2) & 7] + digits_white[(white >> s2) & 7]))
+            total += corner[index]
+
+        for mask, shift, table in self.diagonals:
+            total += table[ternary[(((black & mask) * _DIAGONAL_MAGIC) >> shift) & 0xFF]
+                           + ternary_white[(((white & mask) * _DIAGONAL_MAGIC) >> shift) & 0xFF]]
+
+        return total
+
+    def __call__(self, board, player_color):
+        if board.size != SIZE:
+            raise ValueError(f"Pattern evaluation needs an {SIZE}x{SIZE} board, got {board.size}x{board.size}")
+        score = self.score(board.black, board.white)
+        return score if player_color == 'B' else -score
+
+
+_default_evaluator = None
+
+
+def default_evaluator():
+    """Returns a `PatternEvaluator` over the shipped weight file, loading it on first use."""
+    global _default_evaluator
+    if _default_evaluator is None:
+        _default_evaluator = PatternEvaluator(load_weights())
+    return _default_evaluator
+
+
+def evaluate_board(board, player_color):
+    """
+    Evaluates the board for a player with the shipped pattern weights. A drop-in replacement for
+    `minimax.evaluate_board`: positive values favor `player_color`.
+    """
+    return default_evaluator()(board, player_color)
+
+
+def evaluate_board_bounds():
+    """Returns the (lowest, highest) value `evaluate_board` can take for either player."""
+    low, high = default_evaluator().weights.bounds()
+    return min(low, -high), max(high, -low)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'build':
+        print(__doc__)
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_WEIGHTS_PATH
+    save_weights(build_default_weights(), target)
+    print(f"Wrote {target} ({os.path.getsize(target)} bytes)")
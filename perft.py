@@ -0,0 +1,146 @@
+"""
+Perft: counts the positions reachable in an exact number of plies, to check move generation.
+
+The tree is walked through the public `Board` interface (`valid_moves_mask`, `get_valid_moves`,
+`make_move`, `unmake_move`), so any board implementation can be checked against the published
+counts in `KNOWN_COUNTS`. Passes follow `Game.start`: a player without a legal move passes, which
+uses up a ply, and a position where neither player can move ends the game and counts as a leaf
+whatever depth is left.
+
+Usage:
+    python perft.py [--depth 8] [--divide] [--json]
+"""
+import argparse
+import json
+import sys
+import time
+
+from board import Board
+
+# Leaf counts from the initial position, black to move, in the convention above
+KNOWN_COUNTS = {
+    1: 4,
+    2: 12,
+    3: 56,
+    4: 244,
+    5: 1396,
+    6: 8200,
+    7: 55092,
+    8: 390216,
+    9: 3005288,
+    10: 24571284,
+    11: 212258800,
+    12: 1939886636,
+}
+
+
+def perft(board, color, depth):
+    """
+    Counts the leaf positions of the game tree below a position.
+
+    Args:
+        board (Board): The position. Moves are played on it and taken back, so it is unchanged afterwards.
+        color (str): The player to move ('B' or 'W').
+        depth (int): The number of plies to play, passes included.
+
+    Returns:
+        int: The number of positions reached after `depth` plies, plus the finished games reached earlier.
+    """
+    if depth == 0:
+        return 1
+    other = 'W' if color == 'B' else 'B'
+    moves = board.valid_moves_mask(color)
+    if not moves:
+        if not board.valid_moves_mask(other):
+            return 1
+        return perft(board, other, depth - 1)
+    if depth == 1:
+        # Bulk counting: the last ply needs no moves played
+        return moves.bit_count()
+
+    nodes = 0
+    for row, col in board.get_valid_moves(color):
+        record = board.make_move(row, col, color)
+        nodes += perft(board, other, depth - 1)
+        board.unmake_move(record)
+    return nodes
+
+
+def divide(board, color, depth):
+    """
+    Splits `perft(board, color, depth)` by the first move, to narrow down where two move
+    generators disagree.
+
+    Returns:
+        dict: Maps each move (row, col) to the leaf count below it; a forced pass is keyed None.
+    """
+    other = 'W' if color == 'B' else 'B'
+    moves = board.get_valid_moves(color)
+    if depth == 0 or not moves:
+        return {None: perft(board, color, depth)}
+
+    counts = {}
+    for row, col in moves:
+        record = board.make_move(row, col, color)
+        counts[(row, col)] = perft(board, other, depth - 1)
+        board.unmake_move(record)
+    return counts
+
+
+def run(depth, board=None, color='B'):
+    """
+    Runs perft for every depth from 1 to `depth` and checks the counts of the initial position.
+
+    Args:
+        depth (int): The deepest depth to count.
+        board (Board, optional): The position, the initial one by default.
+        color (str): The player to move.
+
+    Returns:
+        list: One dict per depth with the leaf count, the expected count (None if unknown or not
+        the initial position), whether they match, the time taken and the leaves per second.
+    """
+    initial = board is None
+    if initial:
+        board = Board()
+    results = []
+    for current in range(1, depth + 1):
+        start = time.perf_counter()
+        nodes = perft(board, color, current)
+        seconds = time.perf_counter() - start
+        expected = KNOWN_COUNTS.get(current) if initial and color == 'B' else None
+        results.append({
+            'depth': current,
+            'nodes': nodes,
+            'expected': expected,
+            'ok': expected is None or nodes == expected,
+            'seconds': round(seconds, 6),
+            'nodes_per_second': round(nodes / seconds) if seconds else None,
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count and check the move generator's game tree.")
+    parser.add_argument('--depth', type=int, default=8)
+    parser.add_argument('--divide', action='store_true', help="Show the counts per first move at --depth")
+    parser.add_argument('--json', action='store_true', help="Print one JSON object per depth")
+    args = parser.parse_args()
+
+    if args.divide:
+        counts = divide(Board(), 'B', args.depth)
+        for move, nodes in counts.items():
+            print(f"{move}: {nodes}")
+        print(f"total: {sum(counts.values())}")
+        sys.exit(0)
+
+    failed = False
+    for result in run(args.depth):
+        failed = failed or not result['ok']
+        if args.json:
+            print(json.dumps(result), flush=True)
+            continue
+        status = 'unknown' if result['expected'] is None else ('ok' if result['ok'] else f"expected {result['expected']}")
+        print(f"depth {result['depth']:2}: {result['nodes']:12} leaves {result['seconds']:9.3f}s "
+              f"{result['nodes_per_second']:10} leaves/s  {status}", flush=True)
+    sys.exit(1 if failed else 0)
@@ -1,9 +1,27 @@
-from minimax import minimax
-from expectimax import expectimax
-from board import Board
+from minimax import minimax, iterative_deepening, pvs, evaluate_board, SearchTimeout
+from expectimax import expectimax, evaluation_bounds
+from board import geometry
+from book import OpeningBook, default_book
+from endgame import DEFAULT_EMPTIES, empty_count, solve
 from game import Agent
+import mcts
+from ordering import MoveOrderer
+from parallel import ParallelSearcher
+from stats import SearchStats
+from transposition import TranspositionTable
 import random 
-from collections import defaultdict
+import time
+
+def load_book(book):
+    # Accept an OpeningBook, a path to a book file, True for the shipped book, or None for no book
+    if book is None or book is False:
+        return None
+    if book is True:
+        return default_book()
+    if isinstance(book, str):
+        return OpeningBook(book)
+    return book
+
 class RandomPlayer(Agent):
     def __init__(self, color):
         super().__init__(color)
@@ -12,7 +30,7 @@ class RandomPlayer(Agent):
     def make_move(self, board):
         valid_moves = board.get_valid_moves(self.color)
         if not valid_moves:
-            print(f"{self.color} has no valid moves.")
+            self.events.emit('no_moves', color=self.color)
             return (None, None)
         return random.choice(valid_moves)
     
@@ -20,50 +38,111 @@ class RandomPlayer(Agent):
 
 
 class MCTSPlayer(Agent):
-    def __init__(self, color, simulations=100):
+    def __init__(self, color, simulations=100, workers=None, seed=42, batch_size=None, book=None,
+                 collect_stats=False):
         super().__init__(color)
-        random.seed(42)
+        if workers:
+            # The worker trees use scalar playouts and keep their counters to themselves
+            unsupported = [name for name, value in (('batch_size', batch_size), ('collect_stats', collect_stats))
+                           if value]
+            if unsupported:
+                raise ValueError(f"workers cannot be combined with {', '.join(unsupported)}")
         self.simulations = simulations
+        # Counters of the most recent search, see `stats.SearchStats`
+        self.stats = SearchStats() if collect_stats else None
+        # Opening book consulted before searching, see `load_book`
+        self.book = load_book(book)
+        # A private generator keeps games reproducible without touching the global random state
+        self.seed = seed
+        self.rng = random.Random(mcts.derive_seed(seed))
+        self.turn = 0
+        # With workers, `simulations` is shared out over root-parallel trees (no tree reuse)
+        self.parallel = mcts.RootParallelSearch(workers) if workers else None
+        # With a batch size, every leaf is scored by that many NumPy playouts (needs numpy, 8x8 only)
+        self.batch_size = batch_size
+        self.batch = None
+        if batch_size:
+            from batch_rollout import BatchRollout
+            self.batch = BatchRollout(mcts.derive_seed(seed, 'batch'))
+        # The subtree under the move we played, and the position it starts from, kept for the next turn
+        self.root = None
+        self.root_position = None
+        self.root_size = None
+
+    def close(self):
+        # Shuts down the worker processes of the root-parallel search
+        if self.parallel is not None:
+            self.parallel.close()
     
     def simulate_random_game(self, board, color):
-        current_color = color
-        while not board.is_full() and board.get_valid_moves(current_color):
-            valid_moves = board.get_valid_moves(current_color)
-            if valid_moves:
-                move = random.choice(valid_moves)
-                board.place_disc(move[0], move[1], current_color)
-            current_color = 'B' if current_color == 'W' else 'W'
-        return board.get_score()
+        # Play random moves (passing when forced) to the end; the board is left unchanged
+        return mcts.random_playout(board.black, board.white, color, geometry(board.size), self.rng)
+
+    def reuse_tree(self, board):
+        # Find the current position among the opponent's replies in the tree kept from last turn
+        if self.root is None or board.size != self.root_size:
+            return None
+        geo = geometry(board.size)
+        black, white = self.root_position
+        for child in self.root.children:
+            if child.color != self.color:
+                continue
+            if mcts.play(black, white, self.root.color, child.move, geo) == (board.black, board.white):
+                return child.detach()
+        return None
 
     def mcts(self, board, simulations):
         # Monte Carlo Tree Search main function
-        win_counts = defaultdict(int)
-        play_counts = defaultdict(int)
-
-        for _ in range(simulations):
-            # Choose a random valid move and simulate the result
-            temp_board = board.copy()
-            valid_moves = board.get_valid_moves(self.color)
-            if not valid_moves:
-                return None, None
+        geo = geometry(board.size)
+        self.turn += 1
+        if self.book is not None:
+            book_move = self.book.lookup(board, self.color)
+            if book_move is not None:
+                self.root = None
+                return book_move
+        if self.parallel is not None:
+            return self.parallel_mcts(board, simulations)
 
-            move = random.choice(valid_moves)
-            temp_board.place_disc(move[0], move[1], self.color)
+        root = self.reuse_tree(board)
+        if root is None:
+            root = mcts.Node(None, self.color, None, mcts.untried_moves(board.black, board.white, self.color, geo))
 
-            score_B, score_W = self.simulate_random_game(temp_board, 'B' if self.color == 'W' else 'W')
-            winner = 'B' if score_B > score_W else 'W'
+        if self.batch is not None:
+            mcts.search(root, board.black, board.white, simulations, board.size, self.rng,
+                        batch=self.batch, batch_size=self.batch_size, stats=self.stats)
+        else:
+            mcts.search(root, board.black, board.white, simulations, board.size, self.rng, stats=self.stats)
 
-            play_counts[move] += 1
-            if winner == self.color:
-                win_counts[move] += 1
+        # Play the most visited move and keep its subtree for the next turn
+        best = root.most_visited_child()
+        if best is None or best.move == mcts.PASS:
+            self.root = None
+            return None, None
 
-        # Choose the move with the highest win rate
-        best_move = max(valid_moves, key=lambda x: win_counts[x] / play_counts[x])
+        best_move = divmod(best.move.bit_length() - 1, board.size)
+        self.root_position = mcts.play(board.black, board.white, self.color, best.move, geo)
+        self.root_size = board.size
+        self.root = best.detach()
         return best_move
 
+    def parallel_mcts(self, board, simulations):
+        # Merge the root statistics of independent trees and play the most visited move
+        seed = mcts.derive_seed(self.seed, self.turn)
+        totals = self.parallel.search(board.black, board.white, self.color, simulations, seed, board.size)
+        if not totals:
+            return None, None
+        best = max(totals, key=lambda move: totals[move][0])
+        if best == mcts.PASS:
+            return None, None
+        return divmod(best.bit_length() - 1, board.size)
+
     def make_move(self, board):
         # Use MCTS to make a move
-        return self.mcts(board, self.simulations)
+        if self.stats is None:
+            return self.mcts(board, self.simulations)
+        self.stats.reset()
+        with self.stats.phase('search'):
+            return self.mcts(board, self.simulations)
 
 class IntelligentPlayer(Agent):
     def __init__(self, color):
@@ -96,14 +175,15 @@ class IntelligentPlayer(Agent):
         """Evaluate the board score after making the move."""
         if move is None:
             return float('-inf')  # No move, very bad score
-        temp_board = board.copy()
-        temp_board.place_disc(move[0], move[1], self.color)
-        return self.evaluate_board(temp_board)
+        record = board.make_move(move[0], move[1], self.color)
+        score = self.evaluate_board(board)
+        board.unmake_move(record)
+        return score
 
     def make_move(self, board):
         valid_moves = board.get_valid_moves(self.color)
         if not valid_moves:
-            print(f"{self.color} has no valid moves.")
+            self.events.emit('no_moves', color=self.color)
             return (None, None)
 
         best_move = None
@@ -126,7 +206,7 @@ class FirstValidMovePlayer(Agent):
     def make_move(self, board):
         valid_moves = board.get_valid_moves(self.color)
         if not valid_moves:
-            print(f"{self.color} has no valid moves.")
+            self.events.emit('no_moves', color=self.color)
             return None
         return valid_moves[0]    
     
@@ -135,21 +215,18 @@ class EvaluativePlayer(Agent):
         super().__init__(color)
     
     def make_move(self, board):
-        valid_moves = board.get_valid_moves(self.color)
+        candidates = board.generate_moves(self.color)
+        valid_moves = [move for move, _ in candidates]
         if not valid_moves:
-            print(f"{self.color} has no valid moves.")
+            self.events.emit('no_moves', color=self.color)
             return None
-        print("valid moves: ",valid_moves)
+        self.events.emit('candidates', color=self.color, moves=valid_moves)
         # Simple evaluation: Choose the move that flips the most discs
         best_move = None
         max_flips = 0
         
-        for move in valid_moves:
-            row, col = move
-            # Copy the board and simulate the move
-            board_copy = self.copy_board(board)
-            board_copy.place_disc(row, col, self.color)
-            flips = self.count_flips(board_copy, row, col, self.color)
+        for move, flip_mask in candidates:
+            flips = flip_mask.bit_count()
             if flips > max_flips:
                 max_flips = flips
                 best_move = move
@@ -158,105 +235,189 @@ class EvaluativePlayer(Agent):
 
     def copy_board(self, board):
         # Create a deep copy of the board to simulate moves
-        new_board = Board(board.size)
-        new_board.board = [row[:] for row in board.board]
-        return new_board
+        return board.copy()
     
     def count_flips(self, board, row, col, color):
         # Count how many discs would be flipped by placing a disc at (row, col)
-        flips = 0
-        opponent_color = 'W' if color == 'B' else 'B'
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)]
-        
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            while 0 <= r < board.size and 0 <= c < board.size and board.board[r][c] == opponent_color:
-                r += dr
-                c += dc
-                if 0 <= r < board.size and 0 <= c < board.size and board.board[r][c] == color:
-                    flips += len([(i, j) for i in range(row + dr, r + dr, dr) for j in range(col + dc, c + dc, dc)])
-                    break
-        
-        return flips
+        return board.get_flips(row, col, color).bit_count()
+
+
+# Share of a timed player's budget the exact solver may use before the player searches instead
+SOLVE_SHARE = 0.5
+
+
+def try_solve(board, color, stats=None, time_ms=None):
+    # (True, move) from the exact solver, or (False, None) if it did not finish within
+    # SOLVE_SHARE of `time_ms`; without a budget it always finishes
+    deadline = None if time_ms is None else time.perf_counter() + SOLVE_SHARE * time_ms / 1000.0
+    try:
+        move, _ = solve(board, color, stats, deadline)
+    except SearchTimeout:
+        return False, None
+    return True, move
 
 
 class Minimaxplayer(Agent):
-    def __init__(self, color, depth=3):
+    def __init__(self, color, depth=3, use_pruning=False, tt_size=0, tt_replacement='depth', time_ms=None,
+                 move_ordering=False, collect_stats=False, use_pvs=False, endgame_empties=DEFAULT_EMPTIES,
+                 evaluate=None, workers=None, book=None):
         super().__init__(color)
+        if workers:
+            # The root-parallel search is a plain fixed-depth minimax in every worker
+            unsupported = [name for name, value in (('tt_size', tt_size), ('time_ms', time_ms),
+                                                    ('move_ordering', move_ordering), ('use_pvs', use_pvs),
+                                                    ('collect_stats', collect_stats)) if value]
+            if unsupported:
+                raise ValueError(f"workers cannot be combined with {', '.join(unsupported)}")
         self.depth = depth
+        self.use_pruning = use_pruning
+        # The table is kept between moves so later searches reuse earlier results
+        self.table = TranspositionTable(tt_size, tt_replacement) if tt_size else None
+        # With a time budget the player deepens iteratively instead of stopping at `depth`
+        self.time_ms = time_ms
+        self.ordering = MoveOrderer() if move_ordering else None
+        # Counters of the most recent search, see `stats.SearchStats`
+        self.stats = SearchStats() if collect_stats else None
+        # Principal Variation Search always prunes, whatever `use_pruning` says
+        self.use_pvs = use_pvs
+        # From this many empty squares on the game is solved exactly instead of searched
+        self.endgame_empties = endgame_empties
+        # Leaf evaluation, e.g. pattern_eval.evaluate_board; None means minimax.evaluate_board
+        self.evaluate = evaluate
+        # Fixed-depth searches spread their root moves over this many processes
+        self.searcher = ParallelSearcher(workers) if workers else None
+        # Opening book consulted before searching, see `load_book`
+        self.book = load_book(book)
+
+    def close(self):
+        # Shuts down the worker processes of the parallel searcher
+        if self.searcher is not None:
+            self.searcher.close()
 
     def make_move(self, board):
         # Use minimax to determine the best move
-        move, _ = minimax(board, self.depth, True, self.color)
+        if self.ordering is not None:
+            self.ordering.age()
+        if self.stats is None:
+            move = self.choose_move(board)
+        else:
+            self.stats.reset()
+            with self.stats.phase('search'):
+                move = self.choose_move(board)
 
-        print(f"AI ({self.color}) plays: {move}")
+        self.events.emit('move', color=self.color, move=move)
         if move is None:
             return (None,None)
         
         return move
 
+    def choose_move(self, board):
+        # The book move, else the endgame solution, else the result of the configured search
+        book_move = self.book.lookup(board, self.color) if self.book is not None else None
+        if book_move is not None:
+            return book_move
+        start = time.perf_counter()
+        if empty_count(board) <= self.endgame_empties:
+            # With a time budget the solver may give up, and the rest of the budget goes to searching
+            solved, move = try_solve(board, self.color, self.stats, self.time_ms)
+            if solved:
+                return move
+        if self.time_ms is not None:
+            remaining_ms = max(0.0, self.time_ms - (time.perf_counter() - start) * 1000.0)
+            move, _, _ = iterative_deepening(board, self.color, remaining_ms, use_pruning=True, table=self.table,
+                                             ordering=self.ordering, stats=self.stats, use_pvs=self.use_pvs,
+                                             evaluate=self.evaluate)
+        elif self.searcher is not None:
+            move, _ = self.searcher.search(board, self.depth, self.color, self.use_pruning, self.evaluate)
+        elif self.use_pvs:
+            move, _ = pvs(board, self.depth, self.color, table=self.table, ordering=self.ordering, stats=self.stats,
+                          evaluate=self.evaluate)
+        else:
+            move, _ = minimax(board, self.depth, True, self.color, self.use_pruning, table=self.table,
+                              ordering=self.ordering, stats=self.stats, evaluate=self.evaluate)
+        return move
+
 
-class ExpectimaxPlayer:
-    def __init__(self, color, depth=3):
-        self.color = color
+class ExpectimaxPlayer(Agent):
+    def __init__(self, color, depth=3, endgame_empties=DEFAULT_EMPTIES, evaluate=evaluate_board, book=None,
+                 opponent_model=None, pruning=False, bounds=None, collect_stats=False, time_ms=None):
+        super().__init__(color)
         self.depth = depth
+        # From this many empty squares on the game is solved exactly instead of searched
+        self.endgame_empties = endgame_empties
+        # Budget for the solver; if it runs out the player searches with expectimax after all
+        self.time_ms = time_ms
+        # Leaf evaluation, e.g. pattern_eval.evaluate_board
+        self.evaluate = evaluate
+        # Opening book consulted before searching, see `load_book`
+        self.book = load_book(book)
+        # Weights of the opponent's moves, e.g. expectimax.square_weight_model; None means uniform
+        self.opponent_model = opponent_model
+        # Star1/Star2 pruning needs the range of the evaluation; known evaluators supply their own. It
+        # returns the same moves but is not faster yet: the evaluation bounds are so wide that few
+        # chance nodes are cut, and at depths 3 and 4 the cuts only about pay for their bookkeeping
+        self.pruning = pruning
+        self.bounds = bounds
+        # Counters of the most recent search, see `stats.SearchStats`
+        self.stats = SearchStats() if collect_stats else None
 
     def make_move(self, board):
-        move, _ = expectimax(board, self.depth, True, self.color)
-        print(f"AI ({self.color}) plays: {move}")
+        if self.stats is None:
+            move = self.choose_move(board)
+        else:
+            self.stats.reset()
+            with self.stats.phase('search'):
+                move = self.choose_move(board)
+        self.events.emit('move', color=self.color, move=move)
         if move is None:
             return (None,None)
         return move
 
+    def choose_move(self, board):
+        # The book move, else the endgame solution or the expectimax move
+        book_move = self.book.lookup(board, self.color) if self.book is not None else None
+        if book_move is not None:
+            return book_move
+        if empty_count(board) <= self.endgame_empties:
+            solved, move = try_solve(board, self.color, self.stats, self.time_ms)
+            if solved:
+                return move
+        bounds = None
+        if self.pruning:
+            bounds = self.bounds or evaluation_bounds(self.evaluate, board.size)
+        move, _ = expectimax(board, self.depth, True, self.color, self.evaluate, self.opponent_model, bounds,
+                             self.stats)
+        return move
+
 
 class EvaluativePlayer(Agent):
     def __init__(self, color):
         super().__init__(color)
     
     def make_move(self, board):
-        print(self.color)
-        valid_moves = board.get_valid_moves(self.color)
-        print(valid_moves)
+        candidates = board.generate_moves(self.color)
+        valid_moves = [move for move, _ in candidates]
+        self.events.emit('candidates', color=self.color, moves=valid_moves)
         if not valid_moves:
-            print(f"{self.color} has no valid moves.")
+            self.events.emit('no_moves', color=self.color)
             return None
         
         # Simple evaluation: Choose the move that flips the most discs
         best_move = None
         max_flips = 0
         
-        for move in valid_moves:
-            row, col = move
-            print(move)
-            # Copy the board and simulate the move
-            board_copy = self.copy_board(board)
-            board_copy.place_disc(row, col, self.color)
-            flips = self.count_flips(board_copy, row, col, self.color)
+        for move, flip_mask in candidates:
+            flips = flip_mask.bit_count()
             if flips > max_flips:
                 max_flips = flips
                 best_move = move
-        print(best_move)
+        self.events.emit('move', color=self.color, move=best_move)
         return best_move
 
     def copy_board(self, board):
         # Create a deep copy of the board to simulate moves
-        new_board = Board(board.size)
-        new_board.board = [row[:] for row in board.board]
-        return new_board
+        return board.copy()
     
     def count_flips(self, board, row, col, color):
         # Count how many discs would be flipped by placing a disc at (row, col)
-        flips = 0
-        opponent_color = 'W' if color == 'B' else 'B'
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)]
-        
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            while 0 <= r < board.size and 0 <= c < board.size and board.board[r][c] == opponent_color:
-                r += dr
-                c += dc
-                if 0 <= r < board.size and 0 <= c < board.size and board.board[r][c] == color:
-                    flips += len([(i, j) for i in range(row + dr, r + dr, dr) for j in range(col + dc, c + dc, dc)])
-                    break
-        
-        return flips
\ No newline at end of file
+        return board.get_flips(row, col, color).bit_count()
\ No newline at end of file
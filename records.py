@@ -0,0 +1,243 @@
+"""
+A compact binary format for game records.
+
+A record file starts with a `FILE_HEADER` (magic, format version, board size) followed by one
+record per game:
+
+    RECORD_PREFIX   header length (uint16), move count (uint8)
+    header          first player to move ('B' or 'W'), final black and white disc counts (uint8
+                    each), then the black and white player names, each as a uint8 length and
+                    UTF-8 bytes
+    moves           one byte per ply: row * size + col, or PASS
+
+A 60-move game with short player names takes about 80 bytes, and reading it back is a couple of
+`struct` unpacks instead of unpickling. `GameRecordWriter` is an event sink, so a `game.Game`
+writes its own record as it is played; `read_games` streams the records back one at a time and
+`replay` plays a record out on a `Board`. `record_from_moves` turns a plain list of plies into a
+record.
+
+Usage:
+    python records.py games.rec     # count the games, check that they replay, summarize results
+"""
+import argparse
+import contextlib
+import struct
+import sys
+import time
+from collections import namedtuple
+
+from board import Board
+
+MAGIC = b'OREC'
+VERSION = 1
+
+# File header: magic, format version, board size
+FILE_HEADER = struct.Struct('<4sBB')
+# Before every game: header length, move count
+RECORD_PREFIX = struct.Struct('<HB')
+# Start of the game header: first player to move, black discs, white discs
+_HEADER_FIELDS = struct.Struct('<cBB')
+# Move byte of a pass
+PASS = 0xFF
+
+GameRecord = namedtuple('GameRecord', ['black', 'white', 'first', 'black_score', 'white_score', 'moves'])
+GameRecord.__doc__ = """
+One game: the player names, the color that moved first, the final disc counts, and the plies as
+(row, col) tuples with None for a pass.
+"""
+
+
+def encode_game(record, size=8):
+    """Returns the bytes of one game (prefix, header and moves) for a record file of board `size`."""
+    names = b''
+    for name in (record.black, record.white):
+        encoded = name.encode('utf-8')
+        if len(encoded) > 255:
+            raise ValueError(f"Player name {name!r} is longer than 255 bytes")
+        names += bytes([len(encoded)]) + encoded
+    header = _HEADER_FIELDS.pack(record.first.encode('ascii'), record.black_score, record.white_score) + names
+    if len(record.moves) > 255:
+        raise ValueError(f"A game of {len(record.moves)} plies does not fit in a record")
+    moves = bytes(PASS if move is None else move[0] * size + move[1] for move in record.moves)
+    return RECORD_PREFIX.pack(len(header), len(moves)) + header + moves
+
+
+def decode_header(header):
+    """Returns (black, white, first, black_score, white_score) from the bytes of a game header."""
+    first, black_score, white_score = _HEADER_FIELDS.unpack_from(header, 0)
+    offset = _HEADER_FIELDS.size
+    names = []
+    for _ in range(2):
+        length = header[offset]
+        names.append(header[offset + 1:offset + 1 + length].decode('utf-8'))
+        offset += 1 + length
+    return names[0], names[1], first.decode('ascii'), black_score, white_score
+
+
+class GameRecordWriter:
+    """
+    Appends games to a record file. Also an event sink: given to `game.Game` (on its own or in an
+    `events.TeeSink`), it collects the 'game_start', 'play' and 'pass' events of a game and
+    writes the record on 'game_over', so games are written one by one as they finish.
+
+    Args:
+        target (str or file): A path to create, or a binary file open for writing (left open by `close`).
+        size (int): The board size of every game in the file.
+    """
+
+    def __init__(self, target, size=8):
+        self._owned = isinstance(target, str)
+        self.file = open(target, 'wb') if self._owned else target
+        self.size = size
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION, size))
+        self._game = None
+
+    def write(self, record):
+        """Appends one `GameRecord`."""
+        self.file.write(encode_game(record, self.size))
+
+    def emit(self, event, **fields):
+        if event == 'game_start':
+            if fields['size'] != self.size:
+                raise ValueError(f"Cannot record a {fields['size']}x{fields['size']} game in a file of "
+                                 f"{self.size}x{self.size} games")
+            self._game = {'black': fields['black'], 'white': fields['white'], 'first': fields['first'], 'moves': []}
+        elif self._game is None:
+            return
+        elif event == 'play':
+            self._game['moves'].append(tuple(fields['move']))
+        elif event == 'pass':
+            self._game['moves'].append(None)
+        elif event == 'game_over':
+            self.write(GameRecord(black_score=fields['black'], white_score=fields['white'], **self._game))
+            self._game = None
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_games(source):
+    """
+    Yields the `GameRecord`s of a record file one at a time, without reading the file into memory.
+
+    Args:
+        source (str or file): A path, or a binary file positioned at the start of a record file.
+
+    Raises:
+        ValueError: If the file is not a record file or ends in the middle of a game.
+    """
+    with contextlib.ExitStack() as stack:
+        handle = stack.enter_context(open(source, 'rb')) if isinstance(source, str) else source
+        magic, version, size = FILE_HEADER.unpack(_read_exactly(handle, FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{source} is not a game record file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported game record version {version}")
+        while True:
+            prefix = handle.read(RECORD_PREFIX.size)
+            if not prefix:
+                return
+            if len(prefix) < RECORD_PREFIX.size:
+                raise ValueError("Truncated game record")
+            header_length, move_count = RECORD_PREFIX.unpack(prefix)
+            header = _read_exactly(handle, header_length)
+            moves = _read_exactly(handle, move_count)
+            yield GameRecord(*decode_header(header),
+                             [None if move == PASS else divmod(move, size) for move in moves])
+
+
+def _read_exactly(handle, count):
+    data = handle.read(count)
+    if len(data) != count:
+        raise ValueError("Truncated game record")
+    return data
+
+
+def record_from_moves(moves, black, white, first, size=8):
+    """
+    Builds the `GameRecord` of a game given as its list of plies, such as the move lists that
+    `main.py` used to pickle. Passes may be None or (None, None); the final disc counts come from
+    playing the moves out.
+
+    Raises:
+        ValueError: If a move or pass is illegal.
+    """
+    plies = [None if move is None or move[0] is None else tuple(move) for move in moves]
+    board = Board(size)
+    color = first
+    for move in plies:
+        if move is not None:
+            board.place_disc(move[0], move[1], color)
+        color = 'W' if color == 'B' else 'B'
+    record = GameRecord(black, white, first, *board.get_score(), plies)
+    # Replaying checks every ply
+    for _ in replay(record, size):
+        pass
+    return record
+
+
+def replay(record, size=8):
+    """
+    Plays a game out on a new `Board`, one ply at a time.
+
+    Yields:
+        tuple: (board, color, move) before every ply, move being None for a pass. The same board
+        is yielded each time and the move is played on it when the generator resumes; after the
+        last ply it holds the final position.
+
+    Raises:
+        ValueError: If the record contains an illegal move or pass, or its final score does not
+        match the game.
+    """
+    board = Board(size)
+    color = record.first
+    for move in record.moves:
+        yield board, color, move
+        if move is None:
+            if board.valid_moves_mask(color):
+                raise ValueError(f"{color} passed with legal moves available")
+        elif not board.is_valid_move(move[0], move[1], color):
+            raise ValueError(f"Illegal move {move} for {color}")
+        else:
+            board.place_disc(move[0], move[1], color)
+        color = 'W' if color == 'B' else 'B'
+    if board.get_score() != (record.black_score, record.white_score):
+        raise ValueError(f"Final score {board.get_score()} does not match the recorded "
+                         f"{(record.black_score, record.white_score)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check and summarize a game record file.")
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    with open(args.path, 'rb') as handle:
+        size = FILE_HEADER.unpack(_read_exactly(handle, FILE_HEADER.size))[2]
+        handle.seek(0)
+        games = plies = 0
+        wins = {'B': 0, 'W': 0, None: 0}
+        start = time.perf_counter()
+        for record in read_games(handle):
+            for _ in replay(record, size):
+                plies += 1
+            games += 1
+            wins['B' if record.black_score > record.white_score else
+                 'W' if record.white_score > record.black_score else None] += 1
+        elapsed = time.perf_counter() - start
+        total = handle.tell()
+
+    if not games:
+        print("No games")
+        sys.exit(0)
+    print(f"{games} games, {plies} plies, {total} bytes ({total / games:.1f} bytes per game)")
+    print(f"black wins {wins['B']}, white wins {wins['W']}, draws {wins[None]}")
+    print(f"replayed in {elapsed:.2f}s ({games / elapsed:.0f} games/s)")
@@ -0,0 +1,51 @@
+"""
+Specs that name a search or an agent on the command line, shared by `tournament.py` and
+`analyze.py`.
+
+A spec is `name` or `name:key=value,key=value`. The values are Python literals, or plain strings
+when they do not parse as one, and the options in `FUNCTION_OPTIONS` name a function as
+`module.function`:
+
+    minimax:depth=3,use_pruning=True
+    expectimax:depth=2,evaluate=pattern_eval.evaluate_board
+"""
+import ast
+import importlib
+
+# Options whose values name a function as module.function
+FUNCTION_OPTIONS = ('evaluate', 'opponent_model')
+
+
+def parse_spec(spec, choices, kind):
+    """
+    Splits a spec of the form 'name:key=value,key=value' into its name, which must be one of
+    `choices`, and keyword arguments.
+
+    Args:
+        spec (str): The spec.
+        choices (dict): The accepted names.
+        kind (str): What the name stands for, for error messages.
+
+    Returns:
+        tuple: The name and a dict of keyword arguments.
+
+    Raises:
+        ValueError: If the name is unknown or an option is not of the form key=value.
+    """
+    name, _, options = spec.partition(':')
+    if name not in choices:
+        raise ValueError(f"Unknown {kind} {name!r}, expected one of {', '.join(choices)}")
+    kwargs = {}
+    for option in filter(None, options.split(',')):
+        key, sep, value = option.partition('=')
+        if not sep:
+            raise ValueError(f"Expected key=value in {kind} spec {spec!r}, got {option!r}")
+        try:
+            kwargs[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            kwargs[key] = value
+    for key in FUNCTION_OPTIONS:
+        if isinstance(kwargs.get(key), str):
+            module, _, function = kwargs[key].rpartition('.')
+            kwargs[key] = getattr(importlib.import_module(module), function)
+    return name, kwargs
@@ -0,0 +1,112 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+class SearchStats:
+    """
+    Counters and timers collected by a search when a `SearchStats` object is passed to it.
+
+    Searches only touch the object behind an `if stats is not None` check, so leaving it out
+    costs nothing. Timing is per call, which slows the timed parts down a little while enabled.
+
+    Attributes:
+        nodes (int): Every position the search visited, leaves included.
+        leaves (int): Positions that were evaluated (or, for MCTS, played out) instead of expanded.
+        cutoffs (int): How many times pruning cut off the remaining moves of a node.
+        tt_probes (int): Transposition table lookups.
+        tt_hits (int): Lookups that found an entry for the position.
+        depth (int): The deepest nominal search depth started from the root.
+        times (dict): Seconds spent per phase, e.g. 'movegen', 'evaluate', 'playout', 'search'.
+        calls (dict): How many times each phase was timed.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Sets every counter back to zero."""
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.depth = 0
+        self.times = {}
+        self.calls = {}
+
+    def add_time(self, phase, seconds):
+        """Adds `seconds` to the time of `phase`."""
+        self.times[phase] = self.times.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    def timed(self, phase, function, *args):
+        """Calls `function(*args)`, adding the time it took to `phase`, and returns its result."""
+        start = time.perf_counter()
+        result = function(*args)
+        self.add_time(phase, time.perf_counter() - start)
+        return result
+
+    def leaf(self, evaluate, board, player_color):
+        """Evaluates a leaf with `evaluate`, counting it and timing it as 'evaluate'."""
+        self.leaves += 1
+        return self.timed('evaluate', evaluate, board, player_color)
+
+    @contextmanager
+    def phase(self, name):
+        """Times the body of a `with` block as phase `name`."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def tt_hit_rate(self):
+        """Returns the fraction of transposition table lookups that found an entry."""
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def effective_branching_factor(self, depth=None):
+        """
+        Returns the branching factor b of a uniform tree of the given depth (by default `depth`)
+        with as many nodes as were visited, i.e. the b solving 1 + b + b^2 + ... + b^depth = nodes.
+        """
+        if depth is None:
+            depth = self.depth
+        if depth <= 0 or self.nodes <= 1:
+            return 0.0
+        low, high = 0.0, float(self.nodes)
+        for _ in range(100):
+            middle = (low + high) / 2
+            if sum(middle ** i for i in range(depth + 1)) < self.nodes:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+
+    def to_dict(self):
+        """Returns the counters, derived rates and timers as a JSON-ready dict."""
+        search_time = self.times.get('search')
+        return {
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'cutoffs': self.cutoffs,
+            'depth': self.depth,
+            'effective_branching_factor': round(self.effective_branching_factor(), 4),
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': round(self.tt_hit_rate(), 4),
+            'nodes_per_second': round(self.nodes / search_time) if search_time else None,
+            'times': {phase: round(seconds, 6) for phase, seconds in self.times.items()},
+            'calls': dict(self.calls),
+        }
+
+    def to_json(self, path=None, **extra):
+        """
+        Returns `to_dict()` (plus any `extra` fields, e.g. a version or position id) as JSON, and
+        also appends it as one line to the file at `path` if given.
+        """
+        text = json.dumps({**extra, **self.to_dict()})
+        if path is not None:
+            with open(path, 'a') as handle:
+                handle.write(text + '\n')
+        return text
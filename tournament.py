@@ -0,0 +1,234 @@
+"""
+Headless round-robin tournaments between the agents of `player.py`.
+
+Every pair of agents plays `--games` games, with colours alternating so each side has Black
+(who moves first) in half of them. Games are played with `game.Game` in worker processes and
+each finished game is written as one JSON line as soon as it comes back. The summary at the
+end gives every agent's score (wins plus half the draws) with a 95% Wilson confidence
+interval, and the number of games per second.
+
+Agents are given as `name` or `name:key=value,key=value`, where the values are Python
+literals, and `evaluate` and `opponent_model` can name a function as `module.function`:
+
+    python tournament.py random minimax:depth=2,use_pruning=True mcts:simulations=50 \\
+        --games 20 --workers 4 --output results.jsonl
+"""
+import argparse
+import contextlib
+import inspect
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from events import NullSink
+from game import Game
+from mcts import derive_seed
+from player import (EvaluativePlayer, ExpectimaxPlayer, FirstValidMovePlayer, IntelligentPlayer, MCTSPlayer,
+                    Minimaxplayer, RandomPlayer)
+from specs import parse_spec
+
+# Agent names accepted on the command line
+AGENTS = {
+    'random': RandomPlayer,
+    'first': FirstValidMovePlayer,
+    'evaluative': EvaluativePlayer,
+    'intelligent': IntelligentPlayer,
+    'minimax': Minimaxplayer,
+    'expectimax': ExpectimaxPlayer,
+    'mcts': MCTSPlayer,
+}
+
+# Two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+
+
+def parse_agent(spec):
+    """
+    Splits an agent spec such as 'minimax:depth=3,use_pruning=True' into its name and keyword
+    arguments, see `specs.parse_spec`.
+
+    Args:
+        spec (str): The agent spec.
+
+    Returns:
+        tuple: The agent name and a dict of constructor keyword arguments.
+    """
+    return parse_spec(spec, AGENTS, 'agent')
+
+
+def make_agent(spec, color, seed):
+    """Builds the agent for `spec` playing `color`, seeding it with `seed` if it takes a seed."""
+    name, kwargs = parse_agent(spec)
+    cls = AGENTS[name]
+    if 'seed' in inspect.signature(cls).parameters:
+        kwargs.setdefault('seed', seed)
+    return cls(color, **kwargs)
+
+
+def play_game(index, black_spec, white_spec, seed):
+    """
+    Plays one game and returns its result as a JSON-ready dict.
+
+    Game and agent events go to a `NullSink`. The global random state is reseeded after the agents are built
+    (`RandomPlayer` seeds it with a constant), so every game gets its own random moves.
+    """
+    black = make_agent(black_spec, 'B', derive_seed(seed, index, 'B'))
+    white = make_agent(white_spec, 'W', derive_seed(seed, index, 'W'))
+    random.seed(derive_seed(seed, index))
+
+    game = Game(black, white, NullSink())
+    start = time.perf_counter()
+    try:
+        game.start()
+        seconds = time.perf_counter() - start
+    finally:
+        black.close()
+        white.close()
+
+    black_score, white_score = game.board.get_score()
+    return {
+        'game': index,
+        'black': black_spec,
+        'white': white_spec,
+        'black_score': black_score,
+        'white_score': white_score,
+        'winner': game.winner(),
+        'plies': game.plies,
+        'seconds': round(seconds, 4),
+    }
+
+
+def schedule(agents, games):
+    """Lists the (black, white) specs of a round robin in which each pair plays `games` games."""
+    pairings = []
+    for first, second in itertools.combinations(agents, 2):
+        for round_index in range(games):
+            pairings.append((first, second) if round_index % 2 == 0 else (second, first))
+    return pairings
+
+
+def wilson_interval(score, games, z=Z_95):
+    """
+    Returns the Wilson score interval of a success rate.
+
+    Args:
+        score (float): Wins plus half the draws.
+        games (int): The number of games.
+        z (float): The normal quantile of the confidence level.
+
+    Returns:
+        tuple: The lower and upper bound of the rate.
+    """
+    if games == 0:
+        return 0.0, 1.0
+    rate = score / games
+    denominator = 1 + z * z / games
+    centre = (rate + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+class Standings:
+    """Win, loss and draw counts per agent and per pairing."""
+
+    def __init__(self):
+        self.records = {}
+
+    def _record(self, key):
+        return self.records.setdefault(key, [0, 0, 0])
+
+    def add(self, result):
+        black, white = result['black'], result['white']
+        for agent, opponent, color in ((black, white, 'B'), (white, black, 'W')):
+            for key in ((agent, None), (agent, opponent)):
+                record = self._record(key)
+                if result['winner'] is None:
+                    record[2] += 1
+                elif result['winner'] == color:
+                    record[0] += 1
+                else:
+                    record[1] += 1
+
+    def lines(self):
+        """Returns the summary table as lines of text, overall standings first."""
+        lines = [f"{'agent':<40} {'vs':<40} {'W':>5} {'L':>5} {'D':>5} {'score':>7}  95% CI"]
+        overall = sorted((key for key in self.records if key[1] is None),
+                         key=lambda key: -self._rate(key))
+        pairs = sorted(key for key in self.records if key[1] is not None)
+        for agent, opponent in overall + pairs:
+            wins, losses, draws = self.records[(agent, opponent)]
+            games = wins + losses + draws
+            low, high = wilson_interval(wins + 0.5 * draws, games)
+            lines.append(f"{agent:<40} {opponent or 'all':<40} {wins:>5} {losses:>5} {draws:>5} "
+                         f"{self._rate((agent, opponent)):>7.1%}  [{low:.1%}, {high:.1%}]")
+        return lines
+
+    def _rate(self, key):
+        wins, losses, draws = self.records[key]
+        return (wins + 0.5 * draws) / max(1, wins + losses + draws)
+
+
+def run(agents, games, workers, seed, output):
+    """
+    Plays the round robin and writes one JSON line per game to `output` as games finish.
+
+    Args:
+        agents (list): Agent specs, see `parse_agent`.
+        games (int): Games per pair of agents.
+        workers (int): Worker processes; 1 plays every game in this process.
+        seed (int): The base seed of the tournament.
+        output (file): Where the JSON lines go.
+
+    Returns:
+        tuple: The `Standings` and the elapsed wall time in seconds.
+    """
+    if len(set(agents)) != len(agents):
+        raise ValueError("Agent specs must be distinct")
+    for spec in agents:
+        parse_agent(spec)
+    pairings = schedule(agents, games)
+    standings = Standings()
+
+    def record(result):
+        standings.add(result)
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+
+    start = time.perf_counter()
+    if workers == 1:
+        for index, (black, white) in enumerate(pairings):
+            record(play_game(index, black, white, seed))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(play_game, index, black, white, seed)
+                       for index, (black, white) in enumerate(pairings)]
+            for future in as_completed(futures):
+                record(future.result())
+    return standings, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Play a headless round-robin tournament between agents.")
+    parser.add_argument('agents', nargs='+', help="agent specs such as random or minimax:depth=3,use_pruning=True")
+    parser.add_argument('--games', type=int, default=10, help="games per pair of agents")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='-', help="JSONL results file, '-' for stdout")
+    args = parser.parse_args()
+    if len(args.agents) < 2:
+        parser.error("need at least two agents")
+
+    with contextlib.ExitStack() as stack:
+        output = sys.stdout if args.output == '-' else stack.enter_context(open(args.output, 'w'))
+        standings, elapsed = run(args.agents, args.games, args.workers, args.seed, output)
+
+    played = args.games * len(args.agents) * (len(args.agents) - 1) // 2
+    summary = sys.stderr if args.output == '-' else sys.stdout
+    for line in standings.lines():
+        print(line, file=summary)
+    print(f"{played} games in {elapsed:.2f}s ({played / elapsed:.1f} games/s)", file=summary)
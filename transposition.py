@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+# Kinds of score stored in an entry
+EXACT = 0  # the true minimax value at the stored depth
+LOWER = 1  # a fail-high: the true value is at least `score`
+UPPER = 2  # a fail-low: the true value is at most `score`
+
+TTEntry = namedtuple('TTEntry', ['key', 'depth', 'score', 'flag', 'move'])
+
+REPLACEMENT_POLICIES = ('depth', 'always')
+
+
+class TranspositionTable:
+    """
+    A fixed-size hash table of search results keyed by Zobrist hash.
+
+    Each key maps to a single slot (`key % size`), so memory use is bounded by `size`. When two
+    positions compete for a slot the replacement policy decides which one is kept:
+
+    - `'depth'` (depth-preferred): the new entry wins if it belongs to the same position or was
+      searched at least as deep as the one already stored.
+    - `'always'`: the newest entry always wins.
+
+    Args:
+        size (int): The number of slots in the table.
+        replacement (str): Either `'depth'` or `'always'`.
+    """
+
+    def __init__(self, size=1 << 16, replacement='depth'):
+        if size <= 0:
+            raise ValueError(f"Transposition table size must be positive, got {size}")
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy {replacement!r}, expected one of {REPLACEMENT_POLICIES}")
+        self.size = size
+        self.replacement = replacement
+        self._slots = [None] * size
+
+    def probe(self, key):
+        """Return the `TTEntry` stored for `key`, or None if the slot holds another position."""
+        entry = self._slots[key % self.size]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        """Record a search result, subject to the replacement policy."""
+        index = key % self.size
+        current = self._slots[index]
+        if (current is None or self.replacement == 'always'
+                or current.key == key or depth >= current.depth):
+            self._slots[index] = TTEntry(key, depth, score, flag, move)
+
+    def clear(self):
+        """Forget every stored entry."""
+        self._slots = [None] * self.size
+
+    def __len__(self):
+        return sum(1 for entry in self._slots if entry is not None)